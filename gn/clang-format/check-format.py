@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+
+
+def detect_clang_format_config(path):
+    path = os.path.dirname(os.path.abspath(path))
+
+    while True:
+        for name in ['.clang-format', '_clang-format']:
+            candidate = os.path.join(path, name)
+            if os.path.exists(candidate):
+                return candidate
+
+        dirname = os.path.dirname(path)
+        if dirname == path:
+            return None
+
+        path = dirname
+
+
+class Ledger:
+    """
+    Record the state of all source files that passed the check.
+
+    Each source file has its own entry consisting of the digest of the source
+    file, the digest of its '.clang-format' configuration and a digest of the
+    clang-format version. Source files whose entry did not change do not need
+    to be checked again, no matter what happened to their modification time.
+    Keeping one entry per source file keeps the entries independent of how
+    source files are grouped into invocations.
+    """
+
+    def __init__(self, path, salt):
+        self.path = path
+        self.salt = salt
+        self.digests = {}
+
+    def _get_digest(self, path):
+        if not path:
+            return ''
+
+        if (value := self.digests.get(path)) is not None:
+            return value
+
+        with open(path, 'rb') as file:
+            value = hashlib.file_digest(file, 'blake2b').hexdigest()
+
+        self.digests[path] = value
+
+        return value
+
+    def _get_entry_path(self, source):
+        key = os.path.abspath(source).encode('utf-8')
+        digest = hashlib.blake2b(key, digest_size=16).hexdigest()
+
+        return os.path.join(self.path, digest[:2], f'{digest}.json')
+
+    def get_entry(self, source):
+        config = detect_clang_format_config(source)
+
+        return [self._get_digest(source), self._get_digest(config), self.salt]
+
+    def contains(self, source):
+        try:
+            with open(self._get_entry_path(source), 'r') as file:
+                return json.load(file) == self.get_entry(source)
+        except (OSError, ValueError):
+            return False
+
+    def add(self, source):
+        path = self._get_entry_path(source)
+        tmp = f'{path}.{os.getpid()}.tmp'
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(tmp, 'w') as file:
+            json.dump(self.get_entry(source), file)
+
+        os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Check the format of source files with clang-format and write an '
+            'acknowledgement once all of them passed. With a ledger, all '
+            'source files which already passed the check with the same '
+            'content and configuration are skipped.'
+        )
+    )
+    parser.add_argument(
+        'sources',
+        help='The source files to check.',
+        nargs='*',
+        default=[],
+        type=str,
+    )
+    parser.add_argument(
+        '--clang-format',
+        help='Path to the clang-format executable (default: clang-format)',
+        default='clang-format',
+        type=str,
+    )
+    parser.add_argument(
+        '--ledger',
+        help=(
+            'The ledger directory recording all source files that passed. '
+            'Without a ledger, all source files are checked.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '-o',
+        help='An acknowledgement file written once all source files passed.',
+        metavar='PATH',
+        required=True,
+        type=str,
+    )
+    parser.add_argument(
+        '--salt',
+        help='An additional value, e.g. the clang-format version digest.',
+        required=False,
+        default='',
+        type=str,
+    )
+
+    args = parser.parse_args()
+
+    ledger = Ledger(args.ledger, args.salt) if args.ledger else None
+
+    pending = args.sources
+    if ledger:
+        pending = [x for x in args.sources if not ledger.contains(x)]
+
+    if pending:
+        invocation = [args.clang_format, '--dry-run', '--Werror', *pending]
+
+        result = subprocess.run(invocation, check=False)
+        if result.returncode != 0:
+            sys.exit(result.returncode)
+
+    if ledger:
+        for source in pending:
+            ledger.add(source)
+
+    with open(args.o, 'w'):
+        pass
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
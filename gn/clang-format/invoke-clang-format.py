@@ -24,37 +24,11 @@
 #
 
 import argparse
-import concurrent.futures
 import json
 import os
-import subprocess
 import sys
-import threading
-import time
 
-
-def invoke_clang_format(stop, invocation, source):
-    if stop.is_set():
-        return
-
-    # Complete the invocation
-    invocation += [source]
-
-    # Execute clang-tidy
-    result = subprocess.run(
-        invocation,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        text=True,
-        check=False,
-    )
-
-    # Return the results
-    return argparse.Namespace(
-        command=' '.join(invocation),
-        exit_code=result.returncode,
-        source=source,
-    )
+import util
 
 
 def main():
@@ -84,6 +58,17 @@ def main():
         default=0,
         type=int,
     )
+    parser.add_argument(
+        '--max-load',
+        '-l',
+        help=(
+            'Do not start new clang-format invocations if the load average is '
+            'greater than the specified value.'
+        ),
+        required=False,
+        default=None,
+        type=float,
+    )
     parser.add_argument(
         '--sources',
         help=(
@@ -94,6 +79,16 @@ def main():
         default=[],
         type=lambda x: json.load(open(x, 'r')),
     )
+    parser.add_argument(
+        '--timeout',
+        help=(
+            'Terminate clang-format invocations running longer than the '
+            'specified amount of seconds and treat them as failed.'
+        ),
+        required=False,
+        default=None,
+        type=float,
+    )
 
     args = parser.parse_args()
 
@@ -103,48 +98,21 @@ def main():
         '-i',
     ]
 
-    jobs = min(max(len(args.sources), 1), args.jobs)
-    stop = threading.Event()
-    failed_jobs = 0
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
-        tstart = time.monotonic()
-        # Execute a clang-tidy invocation for each source file.
-        futures = [
-            executor.submit(invoke_clang_format, stop, invocation[:], source)
-            for source in args.sources
-        ]
-
-        # Collect the results from the invocations.
-        for i, future in enumerate(
-            concurrent.futures.as_completed(futures), start=1
-        ):
-            result = future.result()
-
-            if stop.is_set():
-                continue
-
-            elapsed = time.monotonic() - tstart
-            print(
-                (
-                    f'[{i}/{len(args.sources)} :: {elapsed:.3f}] '
-                    f'CLANG-FORMAT {result.source}'
-                ),
-                file=sys.stderr,
-            )
-
-            if result.exit_code == 0:
-                continue
+    runner = util.Runner(
+        'CLANG-FORMAT',
+        jobs=min(max(len(args.sources), 1), args.jobs),
+        keep_going=args.k,
+        timeout=args.timeout,
+        max_load=args.max_load,
+    )
 
-            print(
-                f'FAILED: [code={result.exit_code}]\n{result.command}',
-                file=sys.stderr,
-            )
+    # Execute a clang-format invocation for each source file.
+    jobs = [util.Job(x, [*invocation, x]) for x in args.sources]
 
-            if args.k > 0 and failed_jobs >= args.k:
-                stop.set()
+    summary = runner.run(jobs)
+    runner.report(summary)
 
-    exit_code = failed_jobs != 0
+    exit_code = summary.failed != 0
 
     sys.exit(exit_code)
 
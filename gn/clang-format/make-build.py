@@ -26,6 +26,7 @@
 
 import argparse
 import os
+import subprocess
 import sys
 
 import ninja
@@ -35,8 +36,69 @@ import xxhash
 import gn
 
 
+def get_clang_format_version(clang_format):
+    result = subprocess.run(
+        [clang_format, '--version'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        check=True,
+    )
+
+    return result.stdout
+
+
+def write_rule(writer, args):
+    ledger_args = []
+    if args.ledger_directory:
+        # The version is part of the command such that upgrading clang-format
+        # invalidates all acknowledgements and all ledger entries.
+        version = get_clang_format_version(args.clang_format)
+        digest = xxhash.xxh3_128_hexdigest(version.encode('utf-8'))
+
+        writer.variable('clang_format_version', digest)
+        writer.newline()
+
+        ledger_args = [
+            '--ledger',
+            os.path.relpath(args.ledger_directory, args.build_directory),
+            '--salt',
+            '$clang_format_version',
+        ]
+
+    # The check script writes the acknowledgement itself, so the build does
+    # not depend on any shell utilities.
+    script = os.path.join(os.path.dirname(__file__), 'check-format.py')
+
+    writer.rule(
+        name='clang-format',
+        command=[
+            os.path.realpath(sys.executable),
+            '-S',
+            os.path.abspath(script),
+            '--clang-format',
+            args.clang_format,
+            *ledger_args,
+            '-o',
+            '$out',
+            '$in',
+        ],
+        description='CLANG-FORMAT $shard',
+    )
+
+
 def main():
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--batch-size',
+        help=(
+            'The maximum amount of source files checked by a single '
+            "clang-format invocation. Default is '64'."
+        ),
+        required=False,
+        default=64,
+        type=int,
+    )
     parser.add_argument(
         '--build-directory',
         help=(
@@ -70,11 +132,23 @@ def main():
         default=['*.[ch]', '*.cc', '*.[ch]pp', '*.[ch]xx', '*.hh'],
         type=str,
     )
+    parser.add_argument(
+        '--ledger-directory',
+        help=(
+            'Record the content digests of all source files that passed the '
+            'check in the specified directory and skip these source files in '
+            'subsequent checks, even if their modification time changed.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--metadata',
         help='The builds generated metadata file.',
         required=True,
-        type=gn.Metadata.from_file,
+        type=str,
     )
     parser.add_argument(
         '-o',
@@ -87,23 +161,29 @@ def main():
 
     args = parser.parse_args()
 
-    sources = set(
-        args.metadata.get_if(
-            lambda x: (
-                'source' in x
-                and x['type']
-                in {
-                    'executable',
-                    'shared_library',
-                    'source_set',
-                    'static_library',
-                }
-                and util.any_fnmatch(x['source'], args.include)
-                and not util.any_fnmatch(x['source'], args.exclude)
-            ),
-        ).extract('source')
+    include = util.GlobSet(args.include)
+    exclude = util.GlobSet(args.exclude)
+
+    # Only keep the selected items while loading the metadata. This avoids
+    # holding the metadata of the whole project in memory.
+    metadata = gn.Metadata.from_file(
+        args.metadata,
+        predicate=lambda x: (
+            'source' in x
+            and x['type']
+            in {
+                'executable',
+                'shared_library',
+                'source_set',
+                'static_library',
+            }
+            and include.match(x['source'])
+            and not exclude.match(x['source'])
+        ),
     )
 
+    sources = set(metadata.extract('source'))
+
     writer = ninja.ninja_syntax.Writer(args.o)
 
     writer.comment(
@@ -112,31 +192,35 @@ def main():
     )
     writer.newline()
 
-    writer.rule(
-        name='clang-format',
-        command=[
-            args.clang_format,
-            '--dry-run',
-            '--Werror',
-            '$in',
-            '&&',
-            os.path.realpath(sys.executable),
-            '-c',
-            "\"open('$out', 'w')\"",
-        ],
-        description='CLANG-FORMAT $in',
-    )
+    write_rule(writer, args)
     writer.newline()
 
-    for path in sources:
+    # Check all sources of a directory with as few invocations as possible.
+    # Each shard is acknowledged by a single file once all of its sources
+    # passed the check.
+    shards = {}
+    for path in sorted(sources):
         source = os.path.relpath(path, args.build_directory)
 
-        dirname, filename = os.path.split(source)
-        digest = xxhash.xxh3_128_hexdigest(dirname)
-        output = os.path.join(args.build_directory, digest, f'{filename}.ack')
+        shards.setdefault(os.path.dirname(source), []).append(source)
 
-        writer.build(outputs=[output], rule='clang-format', inputs=[source])
-        writer.newline()
+    batch_size = max(args.batch_size, 1)
+
+    for dirname, items in shards.items():
+        digest = xxhash.xxh3_128_hexdigest(dirname.encode('utf-8'))
+
+        for i in range(0, len(items), batch_size):
+            name = f'{i // batch_size}'
+            output = os.path.join(args.build_directory, digest, f'{name}.ack')
+            variables = {'shard': dirname or '.'}
+
+            writer.build(
+                outputs=[output],
+                rule='clang-format',
+                inputs=items[i : i + batch_size],
+                variables=variables,
+            )
+            writer.newline()
 
     writer.close()
 
@@ -24,6 +24,7 @@
 
 import argparse
 import csv
+import json
 import os
 import re
 import sys
@@ -34,8 +35,11 @@ import gn
 
 
 class Dispatcher:
-    def __init__(self):
+    def __init__(self, metadata=None, thresholds=None):
+        self.metadata = metadata
+        self.thresholds = thresholds or {}
         self.diagnostics = []
+        self.summary = {}
         self.regex = re.compile(
             r'(?P<path>[\w/.-]+):'
             r'(?P<line>\d+):'
@@ -45,23 +49,56 @@ class Dispatcher:
             r'\[(?P<diagnostic>.*)\]'
         )
 
-    def parse_diagnostics(self, iteratable):
+    def _add_diagnostic(self, item):
+        data = None
+        if self.metadata:
+            data = self.metadata.get_file_metadata(item['path'])
+
+        if data:
+            item['target'] = data['target']
+            item['template'] = data['template']
+
+        self.diagnostics.append(item)
+
+        diag = item['diagnostic']
+        count = self.summary.get(diag, 0) + 1
+        self.summary[diag] = count
+
+        threshold = self.thresholds.get(diag, -1)
+
+        return threshold < 0 or threshold >= count
+
+    def parse_diagnostics(self, iteratable, *, fail_fast=False):
+        """
+        Parse the diagnostics from the lines of clang-tidy's output. If
+        'fail_fast' is set, parsing stops as soon as a threshold is exceeded.
+        Returns False if parsing stopped early.
+        """
         for line in iteratable:
             if match := self.regex.match(line):
-                item = match.groupdict()
+                check_ok = self._add_diagnostic(match.groupdict())
 
-                self.diagnostics.append(item)
+                if fail_fast and not check_ok:
+                    return False
 
-    def add_metadata(self, metadata):
-        if not metadata:
-            return
+        return True
+
+    def parse_records(self, iteratable, *, fail_fast=False):
+        """
+        Parse the diagnostics from a stream of JSON lines as emitted by
+        'invoke-clang-tidy.py --format jsonl'.
+        """
+        for line in iteratable:
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            lines = record['output'].splitlines()
 
-        keys = ['target', 'template']
+            if not self.parse_diagnostics(lines, fail_fast=fail_fast):
+                return False
 
-        for item in self.diagnostics:
-            if data := metadata.get_file_metadata(item['path']):
-                for key in keys:
-                    item[key] = data[key]
+        return True
 
     def write_output(self, out):
         if not out:
@@ -81,27 +118,15 @@ class Dispatcher:
         writer.writeheader()
         writer.writerows(self.diagnostics)
 
-    def check_thresholds(self, thresholds):
-        if not thresholds:
+    def check_thresholds(self):
+        if not self.thresholds:
             return True
 
-        # Count how many messages of each diagnostic were emitted
-        summary = {}
-
-        for item in self.diagnostics:
-            diag = item['diagnostic']
-
-            if diag not in summary:
-                summary[diag] = 1
-                continue
-
-            summary[diag] += 1
-
         # Check the threshold for each diagnostic
         check_ok = True
 
-        for diag, count in summary.items():
-            threshold = thresholds.get(diag, -1)
+        for diag, count in self.summary.items():
+            threshold = self.thresholds.get(diag, -1)
             if threshold < 0 or threshold >= count:
                 print(
                     (
@@ -130,8 +155,23 @@ def main():
     )
     parser.add_argument(
         'input',
-        help='A file containing diagnostics generated by clang-tidy.',
-        type=lambda x: open(x, 'r'),
+        help=(
+            "A file containing diagnostics generated by clang-tidy. Use '-' "
+            'to read from stdin.'
+        ),
+        type=lambda x: sys.stdin if x == '-' else open(x, 'r'),
+    )
+    parser.add_argument(
+        '--format',
+        help=(
+            "The format of the input. With 'jsonl' the input is processed "
+            'incrementally and processing stops as soon as a threshold is '
+            "exceeded. Default is 'text'."
+        ),
+        choices=['text', 'jsonl'],
+        required=False,
+        default='text',
+        type=str,
     )
     parser.add_argument(
         '-o',
@@ -162,14 +202,25 @@ def main():
         k: int(v) for k, v in util.invoke_split(args.threshold, '=', maxsplit=1)
     }
 
-    dispatcher = Dispatcher()
-    dispatcher.parse_diagnostics(args.input)
-    dispatcher.add_metadata(args.metadata)
+    dispatcher = Dispatcher(args.metadata, thresholds)
+
+    if args.format == 'jsonl':
+        complete = dispatcher.parse_records(args.input, fail_fast=True)
+    else:
+        complete = dispatcher.parse_diagnostics(args.input)
+
     dispatcher.write_output(args.o)
-    check_ok = dispatcher.check_thresholds(thresholds)
+    check_ok = dispatcher.check_thresholds()
+
+    if not complete:
+        print(
+            f'{sys.argv[0]}: error: analysis aborted early',
+            file=sys.stderr,
+        )
 
-    path = os.path.abspath(args.input.name)
-    print(f'Analysis Output : {path}', file=sys.stderr)
+    if args.input != sys.stdin:
+        path = os.path.abspath(args.input.name)
+        print(f'Analysis Output : {path}', file=sys.stderr)
 
     if args.o:
         path = os.path.abspath(args.o.name)
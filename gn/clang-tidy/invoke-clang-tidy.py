@@ -24,13 +24,17 @@
 #
 
 import argparse
-import concurrent.futures
+import hashlib
 import json
 import os
+import re
 import subprocess
 import sys
 import threading
-import time
+
+import util
+
+import gn
 
 
 def detect_clang_tidy_config(path=None):
@@ -56,42 +60,529 @@ def detect_clang_tidy_config(path=None):
         path = dirname
 
 
-def invoke_clang_tidy(stop, invocation, source):
-    if stop.is_set():
-        return
+class ResultCache:
+    """
+    A content-addressed cache for the results of clang-tidy invocations.
+
+    The key of each entry covers the compile command(s) of the source file,
+    the used '.clang-tidy' configuration, the clang-tidy version and the
+    content of all files the source file depends on. Source files without
+    any known dependencies cannot be cached. Entries are evicted in least
+    recently used order once the cache grows beyond its size limit.
+    """
+
+    def __init__(self, path, size, salt, compile_commands, dependencies):
+        self.path = path
+        self.size = size
+        self.salt = salt
+        self.compile_commands = {}
+        self.dependencies = {}
+        self.digests = {}
+        self.hits = 0
+        self.lock = threading.Lock()
+
+        for entry in compile_commands:
+            file = os.path.join(entry['directory'], entry['file'])
+            command = entry.get('arguments') or entry.get('command')
+
+            key = os.path.abspath(file)
+            self.compile_commands.setdefault(key, []).append(command)
+
+        for entry in dependencies:
+            key = os.path.abspath(entry['main'])
+            self.dependencies.setdefault(key, set()).update(entry['deps'])
+
+    def _get_digest(self, path):
+        if (value := self.digests.get(path)) is not None:
+            return value
+
+        try:
+            with open(path, 'rb') as file:
+                value = hashlib.file_digest(file, 'blake2b').hexdigest()
+        except OSError:
+            value = ''
+
+        self.digests[path] = value
+
+        return value
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.path, key[:2], f'{key}.json')
+
+    def get_key(self, source, config):
+        path = os.path.abspath(source)
+
+        commands = self.compile_commands.get(path)
+        deps = self.dependencies.get(path)
+        if not commands or deps is None:
+            return None
+
+        files = sorted(deps | {source, config})
+        data = {
+            'salt': self.salt,
+            'commands': commands,
+            'files': [[x, self._get_digest(x)] for x in files],
+        }
+
+        value = json.dumps(data, sort_keys=True).encode('utf-8')
+
+        return hashlib.blake2b(value, digest_size=20).hexdigest()
+
+    def contains(self, key):
+        return os.path.isfile(self._get_entry_path(key))
+
+    def load(self, key):
+        path = self._get_entry_path(key)
+
+        try:
+            with open(path, 'r') as file:
+                data = json.load(file)
+
+            # Mark the entry as recently used.
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        with self.lock:
+            self.hits += 1
+
+        return argparse.Namespace(**data)
+
+    def store(self, key, exit_code, output):
+        path = self._get_entry_path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        data = {
+            'exit_code': exit_code,
+            'output': output,
+        }
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(tmp, 'w') as file:
+                json.dump(data, file)
+
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = []
+        usage = 0
+
+        for dirpath, _, filenames in os.walk(self.path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+
+                try:
+                    info = os.stat(path)
+                except OSError:
+                    continue
+
+                entries.append((info.st_mtime_ns, info.st_size, path))
+                usage += info.st_size
+
+        entries.sort()
+
+        for _, size, path in entries:
+            if usage <= self.size:
+                break
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+            usage -= size
+
+
+class History:
+    """
+    Wall times of previous clang-tidy invocations per source file.
+
+    The history is used to submit the most expensive source files first,
+    which keeps a few large translation units from dominating the end of the
+    analysis. Source files without any recorded wall time are estimated from
+    their number of dependencies or, if unavailable, from their file size.
+    """
+
+    def __init__(self, path, dependencies=()):
+        self.path = path
+        self.durations = {}
+        self.weights = {
+            entry['main']: len(entry['deps']) for entry in dependencies
+        }
+
+        if not path:
+            return
+
+        try:
+            with open(path, 'r') as file:
+                self.durations = json.load(file)
+        except (OSError, ValueError):
+            pass
+
+    def _get_weight(self, source):
+        if self.weights:
+            return self.weights.get(source, 0)
+
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return 0
+
+    def get_estimates(self, sources):
+        known = [x for x in sources if x in self.durations]
+        weights = {x: self._get_weight(x) for x in sources}
+
+        # Scale the heuristic to seconds using the recorded wall times.
+        total = sum(weights[x] for x in known)
+        ratio = sum(self.durations[x] for x in known) / total if total else 1
+
+        return {x: self.durations.get(x, weights[x] * ratio) for x in sources}
+
+    def update(self, durations):
+        self.durations.update(durations)
+
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+
+        try:
+            with open(tmp, 'w') as file:
+                json.dump(self.durations, file, indent=4, sort_keys=True)
+
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
 
-    # Complete the invocation
-    config = detect_clang_tidy_config(source)
 
-    invocation += ['--config-file', config, source]
+# Statistics printed by clang-tidy for almost every translation unit. These
+# are not diagnostics of any source file.
+_SUMMARY_REGEX = re.compile(
+    r'^(?:\d+ (?:warnings?|errors?)(?: and \d+ errors?)? generated\.'
+    r'|Suppressed \d+ warnings? \(.*\)\.'
+    r'|Use -header-filter=.*'
+    r'|)$'
+)
 
-    # Execute clang-tidy
+
+def has_diagnostics(output):
+    return any(not _SUMMARY_REGEX.match(x) for x in output.splitlines())
+
+
+def make_batches(sources, batch_size, jobs):
+    if batch_size <= 1:
+        return [[x] for x in sources]
+
+    # Only sources sharing the same configuration can be analyzed together.
+    groups = {}
+    for source in sorted(sources):
+        config = detect_clang_tidy_config(source)
+        groups.setdefault(config, []).append(source)
+
+    # Keep enough batches around to balance the load across all jobs.
+    size = max(1, min(batch_size, len(sources) // (4 * jobs)))
+
+    return [
+        group[i : i + size]
+        for group in groups.values()
+        for i in range(0, len(group), size)
+    ]
+
+
+def partition_sources(sources, batch_size, jobs, cache=None):
+    # Results are cached per source. Sources with a cached result are
+    # replayed on their own, so batches are only assembled from the
+    # remaining sources and do not depend on the cached ones.
+    hits = []
+    if cache:
+        hits = [
+            x
+            for x in sources
+            if (key := cache.get_key(x, detect_clang_tidy_config(x)))
+            and cache.contains(key)
+        ]
+
+    misses = sorted(set(sources).difference(hits))
+
+    return [[x] for x in hits] + make_batches(misses, batch_size, jobs)
+
+
+def get_clang_tidy_version(clang_tidy):
     result = subprocess.run(
-        invocation,
+        [clang_tidy, '--version'],
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
-        check=False,
+        check=True,
     )
 
-    # Return the results
-    return argparse.Namespace(
-        command=' '.join(invocation),
-        exit_code=result.returncode,
-        output=result.stdout,
-        source=source,
+    return result.stdout
+
+
+def make_result_cache(args):
+    with open(os.path.join(args.p, 'compile_commands.json'), 'r') as file:
+        compile_commands = json.load(file)
+
+    salt = [get_clang_tidy_version(args.clang_tidy)]
+    if args.vfsoverlay:
+        with open(args.vfsoverlay, 'r') as file:
+            salt.append(file.read())
+
+    return ResultCache(
+        args.cache_dir,
+        args.cache_size,
+        salt,
+        compile_commands,
+        args.dependencies,
     )
 
 
+def make_job(invocation, sources, cache=None, estimate=0.0):
+    # Complete the invocation
+    config = detect_clang_tidy_config(sources[0])
+    command = [*invocation, '--config-file', config, *sources]
+
+    job = util.Job(' '.join(sources), command, estimate=estimate)
+    job.sources = sources
+
+    if not cache:
+        return job
+
+    key = None
+
+    # Replay the results of a previous invocation if possible. Batches are
+    # only made of sources without cached results.
+    def prepare():
+        nonlocal key
+
+        if len(sources) != 1:
+            return None
+
+        key = cache.get_key(sources[0], config)
+
+        return cache.load(key) if key else None
+
+    def finish(result):
+        if key:
+            cache.store(key, result.exit_code, result.output)
+            return
+
+        # The output of a batch cannot be attributed to its sources reliably.
+        # Only record the sources of batches that passed without diagnostics.
+        if result.exit_code != 0 or has_diagnostics(result.output):
+            return
+
+        for source in sources:
+            if value := cache.get_key(source, config):
+                cache.store(value, 0, '')
+
+    job.prepare = prepare
+    job.finish = finish
+
+    return job
+
+
+def write_result(out, result, output_format):
+    if output_format == 'jsonl':
+        record = {
+            'sources': result.job.sources,
+            'command': ' '.join(result.job.command),
+            'exit_code': result.exit_code,
+            'cached': result.cached,
+            'duration': result.duration,
+            'output': result.output,
+        }
+
+        print(json.dumps(record), file=out, flush=True)
+    else:
+        print(result.output, end='', file=out)
+
+
+def get_source_costs(summary, metadata=None):
+    items = []
+
+    for result in summary.results:
+        # Distribute the costs of a batch evenly across its sources.
+        n = len(result.job.sources)
+
+        for source in result.job.sources:
+            item = {
+                'source': source,
+                'target': None,
+                'template': None,
+                'exit_code': result.exit_code,
+                'cached': result.cached,
+                'wall': result.duration / n,
+                'user': result.user / n,
+                'system': result.system / n,
+                'rss': result.rss,
+            }
+
+            try:
+                data = metadata.get_file_metadata(source) if metadata else {}
+            except KeyError:
+                data = {}
+
+            item['target'] = data.get('target')
+            item['template'] = data.get('template')
+
+            items.append(item)
+
+    return sorted(items, key=lambda x: x['wall'], reverse=True)
+
+
+def get_target_costs(sources):
+    targets = {}
+
+    for item in sources:
+        target = targets.setdefault(
+            item['target'],
+            {
+                'target': item['target'],
+                'template': item['template'],
+                'sources': 0,
+                'wall': 0.0,
+                'user': 0.0,
+                'system': 0.0,
+                'rss': 0,
+            },
+        )
+
+        target['sources'] += 1
+        target['wall'] += item['wall']
+        target['user'] += item['user']
+        target['system'] += item['system']
+        target['rss'] = max(target['rss'], item['rss'])
+
+    return sorted(targets.values(), key=lambda x: x['wall'], reverse=True)
+
+
+def write_reports(args, runner, summary):
+    if args.trace:
+        with open(args.trace, 'w') as file:
+            runner.write_trace(summary, file)
+
+    if not args.report:
+        return
+
+    metadata = None
+    if args.metadata:
+        selected = {x for y in summary.results for x in y.job.sources}
+        metadata = gn.Metadata.from_file(
+            args.metadata, predicate=lambda x: x['source'] in selected
+        )
+
+    sources = get_source_costs(summary, metadata)
+    report = {
+        'makespan': summary.makespan,
+        'jobs': runner.jobs,
+        'sources': sources,
+        'targets': get_target_costs(sources),
+    }
+
+    with open(args.report, 'w') as file:
+        json.dump(report, file, indent=4)
+
+
+def emit_result(args, result):
+    try:
+        write_result(args.o, result, args.format)
+    except BrokenPipeError:
+        # The consumer of the output is gone; stop the analysis and silence
+        # any further attempts to flush the output.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, args.o.fileno())
+
+        return False
+
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(description='Invoke clang-tidy')
 
+    parser.add_argument(
+        '--batch-size',
+        help=(
+            'Analyze up to the specified amount of source files sharing the '
+            'same configuration with a single clang-tidy invocation. Smaller '
+            "batches are used to keep all jobs busy. Default is '1'."
+        ),
+        required=False,
+        default=1,
+        type=int,
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help=(
+            'Cache the results of clang-tidy invocations in the specified '
+            'directory. Caching requires dependency data.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--cache-size',
+        help=(
+            'The maximum size of the cache in bytes. Least recently used '
+            "results are evicted first. Default is '1073741824'."
+        ),
+        required=False,
+        default=1 << 30,
+        type=int,
+    )
     parser.add_argument(
         '--clang-tidy',
         help='Path to the clang-tidy executable (default: clang-tidy)',
         default='clang-tidy',
         type=str,
     )
+    parser.add_argument(
+        '--dependencies',
+        help='The dependencies of all translation units.',
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=lambda x: json.load(open(x, 'r')),
+    )
+    parser.add_argument(
+        '--format',
+        help=(
+            "The format of the output. With 'jsonl' a JSON record is emitted "
+            'as soon as a clang-tidy invocation finished. '
+            "Default is 'text'."
+        ),
+        choices=['text', 'jsonl'],
+        required=False,
+        default='text',
+        type=str,
+    )
+    parser.add_argument(
+        '--grace-period',
+        help=(
+            'The time in seconds granted to running clang-tidy invocations '
+            'to terminate once the analysis is stopped before they are '
+            "killed. Default is '2'."
+        ),
+        required=False,
+        default=2.0,
+        type=float,
+    )
+    parser.add_argument(
+        '--history',
+        help=(
+            'A file used to record the wall time of each clang-tidy '
+            'invocation. Source files are analyzed longest-first based on '
+            'the recorded wall times.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--jobs',
         '-j',
@@ -110,16 +601,38 @@ def main():
         default=1,
         type=int,
     )
+    parser.add_argument(
+        '--max-load',
+        '-l',
+        help=(
+            'Do not start new clang-tidy invocations if the load average is '
+            'greater than the specified value.'
+        ),
+        required=False,
+        default=None,
+        type=float,
+    )
+    parser.add_argument(
+        '--metadata',
+        help=(
+            "The project's metadata file used to attribute the costs of the "
+            'analysis in the report to targets.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '-o',
         help=(
             'An output file containing all diagnostics generated by all '
-            'clang-tidy invocations.'
+            "clang-tidy invocations. Use '-' to write to stdout."
         ),
         metavar='PATH',
         required=False,
         default=sys.stderr,
-        type=lambda x: open(x, 'w'),
+        type=lambda x: sys.stdout if x == '-' else open(x, 'w'),
     )
     parser.add_argument(
         '-p',
@@ -128,6 +641,18 @@ def main():
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--report',
+        help=(
+            'Write a JSON report containing the wall time, the user and '
+            'system CPU time and the peak RSS of each source file and '
+            'target, ordered by wall time.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--sources',
         help=(
@@ -138,6 +663,24 @@ def main():
         default=[],
         type=lambda x: json.load(open(x, 'r')),
     )
+    parser.add_argument(
+        '--timeout',
+        help=(
+            'Terminate clang-tidy invocations running longer than the '
+            'specified amount of seconds and treat them as failed.'
+        ),
+        required=False,
+        default=None,
+        type=float,
+    )
+    parser.add_argument(
+        '--trace',
+        help=('Write a Chrome trace event file of all clang-tidy invocations.'),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--vfsoverlay',
         help=(
@@ -151,6 +694,9 @@ def main():
 
     args = parser.parse_args()
 
+    if args.cache_dir and args.dependencies is None:
+        parser.error('--cache-dir requires --dependencies')
+
     if value := os.environ.get('CLANG_TIDY_SOURCES'):
         sources = set(value.split(os.pathsep))
 
@@ -161,57 +707,64 @@ def main():
         args.clang_tidy,
         '-p',
         args.p,
+        '--quiet',
     ]
 
     if args.vfsoverlay:
         invocation += ['--vfsoverlay', args.vfsoverlay]
 
-    jobs = min(max(len(args.sources), 1), args.jobs)
-    stop = threading.Event()
-    failed_jobs = 0
-
-    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
-        tstart = time.monotonic()
-        # Execute a clang-tidy invocation for each source file.
-        futures = [
-            executor.submit(invoke_clang_tidy, stop, invocation[:], source)
-            for source in args.sources
-        ]
-
-        # Collect the results from the invocations.
-        for i, future in enumerate(
-            concurrent.futures.as_completed(futures), start=1
-        ):
-            result = future.result()
+    cache = make_result_cache(args) if args.cache_dir else None
+    history = History(args.history, args.dependencies or [])
+    estimates = history.get_estimates(args.sources)
 
-            if stop.is_set():
-                continue
-
-            elapsed = time.monotonic() - tstart
-            print(
-                (
-                    f'[{i}/{len(args.sources)} :: {elapsed:.3f}] '
-                    f'CLANG-TIDY {result.source}'
-                ),
-                file=sys.stderr,
-            )
-            print(result.output, end='', file=args.o)
-
-            if result.exit_code == 0:
-                continue
+    runner = util.Runner(
+        'CLANG-TIDY',
+        jobs=min(max(len(args.sources), 1), args.jobs),
+        keep_going=args.k,
+        timeout=args.timeout,
+        max_load=args.max_load,
+    )
+    runner.grace_period = args.grace_period
 
-            failed_jobs += 1
-            print(
-                f'FAILED: [code={result.exit_code}]\n{result.command}',
-                file=sys.stderr,
-            )
+    jobs = [
+        make_job(invocation, x, cache, sum(estimates[y] for y in x))
+        for x in partition_sources(
+            args.sources, args.batch_size, runner.jobs, cache
+        )
+    ]
+    jobs.sort(key=lambda x: x.estimate, reverse=True)
+
+    # Without any recorded wall times the estimates are not in seconds.
+    if not history.durations:
+        for job in jobs:
+            job.estimate = 0.0
+
+    summary = runner.run(jobs, lambda x: emit_result(args, x))
+    runner.report(summary)
+    write_reports(args, runner, summary)
+
+    # Jobs which timed out or were cancelled only ran partially. Their
+    # durations would underestimate exactly the slowest sources.
+    if args.history:
+        history.update(
+            {
+                source: x.duration / len(x.job.sources)
+                for x in summary.results
+                if not x.cached and x.exit_code is not None
+                for source in x.job.sources
+            }
+        )
 
-            if args.k > 0 and failed_jobs >= args.k:
-                stop.set()
+    if cache:
+        cache.evict()
+        print(
+            f'clang-tidy cache: {cache.hits}/{len(args.sources)} hits',
+            file=sys.stderr,
+        )
 
-    exit_code = failed_jobs != 0
+    exit_code = summary.failed != 0 or summary.aborted
 
-    if exit_code and args.o != sys.stderr:
+    if exit_code and args.o not in {sys.stderr, sys.stdout}:
         print(
             (
                 f'{sys.argv[0]}: error: analysis failed; check diagnostics '
@@ -70,14 +70,14 @@ def main():
 
     args = parser.parse_args()
 
+    include = util.GlobSet(args.include)
+    exclude = util.GlobSet(args.exclude)
+
     sources = set(
         args.description.get_if(lambda x: len(x['sources']) != 0).extract(
             'sources',
             flatten=True,
-            predicate=lambda x: (
-                util.any_fnmatch(x, args.include)
-                and not util.any_fnmatch(x, args.exclude)
-            ),
+            predicate=lambda x: include.match(x) and not exclude.match(x),
         )
     )
 
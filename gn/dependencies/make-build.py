@@ -24,23 +24,82 @@
 #
 
 import argparse
+import json
 import os
 import sys
 
 import ninja
+import xxhash
 
-import gn
 
+def write_if_changed(path, data):
+    """
+    Write the data to the file, unless it already contains the very same
+    data. Keeping the modification time of unchanged files allows ninja to
+    skip all edges depending on them.
+    """
+    try:
+        with open(path, 'r') as file:
+            if file.read() == data:
+                return
+    except OSError:
+        pass
 
-class PathTransformer:
-    def __init__(self, build_dir):
-        self.build_dir = build_dir
+    os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    def __call__(self, path):
-        if os.path.isabs(path):
-            return path
+    with open(path, 'w') as file:
+        file.write(data)
 
-        return os.path.relpath(path, self.build_dir)
+
+def make_shards(compile_commands, batch_size):
+    # Scan all sources of a directory with as few invocations as possible.
+    # Touching a source file only rescans the shard it belongs to.
+    groups = {}
+    for entry in compile_commands:
+        path = os.path.join(entry['directory'], entry['file'])
+        path = os.path.abspath(path)
+
+        groups.setdefault(os.path.dirname(path), []).append(entry)
+
+    shards = {}
+    for dirname, entries in sorted(groups.items()):
+        digest = xxhash.xxh3_128_hexdigest(dirname.encode('utf-8'))
+
+        for i in range(0, len(entries), batch_size):
+            name = f'{digest}-{i // batch_size}'
+            shards[name] = entries[i : i + batch_size]
+
+    return shards
+
+
+def write_rules(writer, args):
+    # Ninja already runs the shards in parallel. Keep each clang-scan-deps
+    # process from starting one worker thread per core on top of that.
+    writer.rule(
+        name='clang-scan-deps',
+        command=[
+            args.clang_scan_deps,
+            '-j',
+            '1',
+            '-compilation-database',
+            '$compile_commands',
+            '-mode',
+            'preprocess-dependency-directives',
+            '-format',
+            'experimental-full',
+            '-o',
+            '$out',
+        ],
+        description='SCAN $out',
+    )
+    writer.newline()
+
+    writer.rule(
+        name='stamp',
+        command=['touch', '$out'],
+        description='STAMP $out',
+    )
+    writer.newline()
 
 
 def main():
@@ -53,9 +112,22 @@ def main():
         default=sys.stdout,
         type=lambda x: open(x, 'w'),
     )
+    parser.add_argument(
+        '--batch-size',
+        help=(
+            'The maximum amount of translation units scanned by a single '
+            "clang-scan-deps invocation. Default is '64'."
+        ),
+        required=False,
+        default=64,
+        type=int,
+    )
     parser.add_argument(
         '--build-output',
-        help='The output file resulting from the generated build.',
+        help=(
+            'The output file resulting from the generated build. It lists '
+            'the results of all shards, relative to the working directory.'
+        ),
         required=True,
         type=str,
     )
@@ -76,64 +148,80 @@ def main():
         '--compile-commands',
         help="The project's compile_commands.json file.",
         required=True,
-        type=str,
-    )
-    parser.add_argument(
-        '--description',
-        help="The project's dispatched description file.",
-        required=True,
-        type=gn.Description.from_file,
+        type=lambda x: json.load(open(x, 'r')),
     )
 
     args = parser.parse_args()
 
-    transform = PathTransformer(args.build_directory)
-
-    inputs = set(
-        args.description.get_if(
-            lambda item: (
-                item['type']
-                in {
-                    'executable',
-                    'static_library',
-                    'shared_library',
-                    'source_set',
-                }
-            )
-        ).extract('sources', flatten=True)
-    )
+    shards = make_shards(args.compile_commands, max(args.batch_size, 1))
+    shard_dir = os.path.join(args.build_directory, 'shards')
 
     writer = ninja.ninja_syntax.Writer(args.o)
 
     writer.comment('Automatically generated file to invoke clang-scan-deps.')
     writer.newline()
 
-    writer.rule(
-        name='clang-scan-deps',
-        command=[
-            args.clang_scan_deps,
-            '-compilation-database',
-            args.compile_commands,
-            '-mode',
-            'preprocess-dependency-directives',
-            '-format',
-            'experimental-full',
-            '-o',
-            '$out',
-        ],
-        description='SCAN $out',
+    write_rules(writer, args)
+
+    # Each shard gets its own compilation database. Only databases whose
+    # content changed are rewritten, so that modified compile commands
+    # rescan only the affected shards.
+    outputs = []
+    for name, entries in shards.items():
+        compile_commands = os.path.join('shards', f'{name}.json')
+        output = os.path.join('shards', f'{name}.deps.json')
+
+        write_if_changed(
+            os.path.join(args.build_directory, compile_commands),
+            json.dumps(entries, indent=4),
+        )
+
+        inputs = [
+            os.path.relpath(
+                os.path.join(x['directory'], x['file']),
+                os.path.abspath(args.build_directory),
+            )
+            for x in entries
+        ]
+
+        writer.build(
+            outputs=output,
+            rule='clang-scan-deps',
+            inputs=inputs,
+            implicit=compile_commands,
+            variables={'compile_commands': compile_commands},
+        )
+        writer.newline()
+
+        outputs.append(output)
+
+    # The build output lists the results of all shards, such that consumers
+    # can process each shard on its own. It is touched whenever a shard was
+    # rescanned.
+    write_if_changed(
+        os.path.join(args.build_directory, args.build_output),
+        '\n'.join(os.path.join(args.build_directory, x) for x in outputs),
     )
-    writer.newline()
 
     writer.build(
         outputs=args.build_output,
-        rule='clang-scan-deps',
-        inputs=[transform(path) for path in inputs],
+        rule='stamp',
+        inputs=outputs,
     )
     writer.newline()
 
     writer.close()
 
+    # Remove the databases and results of shards which no longer exist.
+    if os.path.isdir(shard_dir):
+        names = {f'{x}.json' for x in shards} | {
+            f'{x}.deps.json' for x in shards
+        }
+
+        for name in os.listdir(shard_dir):
+            if name not in names:
+                os.remove(os.path.join(shard_dir, name))
+
     sys.exit(0)
 
 
@@ -24,6 +24,7 @@
 #
 
 import argparse
+import hashlib
 import json
 import os
 import sys
@@ -31,17 +32,68 @@ import sys
 import util
 import vfs
 
+import gn
+
+
+class PrefixTrie:
+    """
+    Find the longest prefix of a path for which a mapping is specified.
+
+    If the same prefix is specified multiple times, its first mapping
+    is used.
+    """
+
+    def __init__(self, mappings):
+        self.root = {}
+
+        for source, dest in mappings:
+            node = self.root
+            for char in source:
+                node = node.setdefault(char, {})
+
+            node.setdefault(None, dest)
+
+    def match(self, path):
+        node = self.root
+        value = None
+
+        if None in node:
+            value = 0, node[None]
+
+        for i, char in enumerate(path, 1):
+            if (node := node.get(char)) is None:
+                break
+
+            if None in node:
+                value = i, node[None]
+
+        return value
+
 
 class PathTransformer:
-    def __init__(self, build_dir, vfs_map, prefix_map):
+    """
+    Transform the paths within the output of clang-scan-deps.
+
+    Headers are listed by most of the translation units. Each raw path is
+    therefore only transformed, and matched against the excluded globs,
+    once per run.
+    """
+
+    def __init__(self, build_dir, vfs_map, prefix_map, exclude_deps=None):
         if not vfs_map:
             vfs_map = vfs.VirtualFileSystemMap()
 
+        if not exclude_deps:
+            exclude_deps = util.GlobSet([])
+
         self.build_dir = build_dir
         self.vfs_map = vfs_map
-        self.mappings = [item.split('=', 1) for item in prefix_map]
+        self.trie = PrefixTrie([item.split('=', 1) for item in prefix_map])
+        self.exclude_deps = exclude_deps
+        self.paths = {}
+        self.deps = {}
 
-    def __call__(self, path):
+    def _transform(self, path):
         if value := self.vfs_map.get_source(path):
             return value
 
@@ -50,23 +102,130 @@ class PathTransformer:
         else:
             path = os.path.normpath(path)
 
-        for source, dest in self.mappings:
-            if path.startswith(source):
-                path = path.removeprefix(source)
+        if match := self.trie.match(path):
+            size, dest = match
 
-                return os.path.join(dest, path)
+            # Without a trailing separator in the prefix, the remainder
+            # would be an absolute path, discarding the destination.
+            return os.path.join(dest, path[size:].lstrip(os.sep))
 
         return path
 
+    def __call__(self, path):
+        if (value := self.paths.get(path)) is None:
+            value = self.paths[path] = self._transform(path)
+
+        return value
+
+    def get_dependency(self, path):
+        """
+        Return the transformed path of a dependency or None if the
+        dependency is excluded.
+        """
+        if path in self.deps:
+            return self.deps[path]
+
+        value = None
+        if not self.exclude_deps.match(os.path.normpath(path)):
+            value = self(path)
+
+        self.deps[path] = value
+
+        return value
+
+
+def transform_units(units, transform):
+    data = []
+
+    for entry in units:
+        for command in entry['commands']:
+            deps = (
+                transform.get_dependency(x)
+                for x in dict.fromkeys(command.get('file-deps', []))
+            )
+
+            item = {
+                'main': transform(command['input-file']),
+                'deps': [x for x in deps if x is not None],
+            }
+
+            data.append(item)
+
+    return data
+
+
+def state_path(path):
+    """Return the path of the file tracking the shards of a result."""
+    return os.path.splitext(path)[0] + '.shards.json'
+
+
+def get_salt(args):
+    # Any option changing the transformation of paths invalidates all
+    # results of a previous run.
+    data = [args.build_dir, args.exclude_deps, args.prefix_map, '']
+
+    if args.vfs_config:
+        with open(args.vfs_config, 'rb') as file:
+            data[-1] = hashlib.file_digest(file, 'blake2b').hexdigest()
+
+    value = json.dumps(data).encode('utf-8')
+
+    return hashlib.blake2b(value, digest_size=20).hexdigest()
+
+
+def get_stamp(path):
+    stat = os.stat(path)
+
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def load_previous(path, salt):
+    """
+    Return the shards of a previous result and its translation units.
+    Nothing is returned if the previous result is unavailable, was modified
+    afterwards or was generated with different options.
+    """
+    try:
+        with open(state_path(path), 'r') as file:
+            state = json.load(file)
+
+        if state['salt'] != salt or state['stamp'] != get_stamp(path):
+            return {}, []
+
+        with open(path, 'r') as file:
+            items = json.load(file)
+    except (OSError, ValueError, KeyError):
+        return {}, []
+
+    return state['shards'], items
+
+
+def write_json(path, data):
+    if not path:
+        json.dump(data, sys.stdout, separators=(',', ':'))
+        return
+
+    tmp = f'{path}.{os.getpid()}.tmp'
+
+    with open(tmp, 'w') as file:
+        json.dump(data, file, separators=(',', ':'))
+
+    os.replace(tmp, path)
+
 
 def main():
     parser = argparse.ArgumentParser(
-        description='Convert clang-scan-deps full output data.'
+        description='Convert clang-scan-deps full output data.',
+        fromfile_prefix_chars='@',
     )
     parser.add_argument(
         'input',
-        help="The output of clang-scan-deps using the 'full' output format.",
-        type=lambda x: json.load(open(x, 'r')),
+        help=(
+            "The outputs of clang-scan-deps using the 'full' output format. "
+            'Use @FILE to read the paths of the outputs from a file.'
+        ),
+        nargs='+',
+        type=str,
     )
     parser.add_argument(
         '--build-dir',
@@ -87,13 +246,33 @@ def main():
         default=[],
         type=str,
     )
+    parser.add_argument(
+        '--impact-index',
+        help=(
+            'An additional output file mapping each dependency to the '
+            'translation units depending on it. With --metadata, the targets '
+            'of these translation units are listed as well.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--metadata',
+        help="The project's metadata file.",
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=gn.Metadata.from_file,
+    )
     parser.add_argument(
         '-o',
         help='The output file containing the converted data.',
         metavar='PATH',
         required=False,
-        default=sys.stdout,
-        type=lambda x: open(x, 'w'),
+        default=None,
+        type=str,
     )
     parser.add_argument(
         '--prefix-map',
@@ -106,6 +285,30 @@ def main():
         default=[],
         type=str,
     )
+    parser.add_argument(
+        '--previous',
+        help=(
+            'A result of a previous run. Translation units of inputs which '
+            'did not change since are taken from it instead of being '
+            'converted again. The shards of the new result are tracked for '
+            'the next run.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--sidecar',
+        help=(
+            'An additional, memory-mappable binary representation of the '
+            'generated output file.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=lambda x: open(x, 'wb'),
+    )
     parser.add_argument(
         '--vfs-config',
         help=(
@@ -114,40 +317,78 @@ def main():
         ),
         required=False,
         default=None,
-        type=vfs.VirtualFileSystemMap.from_vfs_config,
+        type=str,
     )
 
     args = parser.parse_args()
 
+    if args.previous and not args.o:
+        parser.error('--previous requires -o')
+
+    vfs_map = None
+    if args.vfs_config:
+        vfs_map = vfs.VirtualFileSystemMap.from_vfs_config(args.vfs_config)
+
     transform = PathTransformer(
-        args.build_dir, args.vfs_config, args.prefix_map
+        args.build_dir,
+        vfs_map,
+        args.prefix_map,
+        util.GlobSet(args.exclude_deps),
     )
-    data = []
 
-    for entry in args.input['translation-units']:
-        for command in entry['commands']:
-            item = {
-                'main': transform(command['input-file']),
-                'deps': [],
-            }
+    salt = get_salt(args)
+    shards, units = {}, []
+    if args.previous:
+        shards, units = load_previous(args.previous, salt)
+
+    data = []
+    state = {}
 
-            visited = set()
-            for path in command.get('file-deps', []):
-                if path in visited:
-                    continue
+    for path in args.input:
+        stamp = get_stamp(path)
 
-                visited.add(path)
+        # Reuse the translation units of shards that did not change. Each
+        # shard refers to the range of its own translation units within the
+        # previous result.
+        entry = shards.get(path)
+        if (
+            entry
+            and entry['stamp'] == stamp
+            and entry['offset'] + entry['count'] <= len(units)
+        ):
+            items = units[entry['offset'] : entry['offset'] + entry['count']]
+        else:
+            with open(path, 'r') as file:
+                items = transform_units(
+                    json.load(file)['translation-units'], transform
+                )
 
-                normpath = os.path.normpath(path)
+        state[path] = {
+            'stamp': stamp,
+            'offset': len(data),
+            'count': len(items),
+        }
+        data += items
 
-                if util.any_fnmatch(normpath, args.exclude_deps):
-                    continue
+    write_json(args.o, data)
 
-                item['deps'].append(transform(path))
+    if args.impact_index:
+        dependencies = gn.Dependencies(data)
+        write_json(
+            args.impact_index, dependencies.get_impact_index(args.metadata)
+        )
 
-            data.append(item)
+    if args.previous:
+        write_json(
+            state_path(args.o),
+            {'salt': salt, 'stamp': get_stamp(args.o), 'shards': state},
+        )
 
-    print(json.dumps(data, indent=4), file=args.o)
+    # The sidecar is written last, so its modification time marks it as being
+    # up to date with the written dependencies.
+    if args.sidecar:
+        gn.deps.write(args.sidecar, data)
+        args.sidecar.close()
 
     sys.exit(0)
 
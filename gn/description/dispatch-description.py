@@ -53,6 +53,17 @@ def main():
         default=sys.stdout,
         type=lambda x: open(x, 'w'),
     )
+    parser.add_argument(
+        '--sidecar',
+        help=(
+            'An additional, memory-mappable binary representation of the '
+            'generated output file.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=lambda x: open(x, 'wb'),
+    )
 
     args = parser.parse_args()
 
@@ -64,9 +75,21 @@ def main():
                 path_dispatch(path, root) for path in item.get(key, [])
             ]
 
+        # Public headers are either listed explicitly or '*' if all headers
+        # of the target are public.
+        if isinstance(item.get('public'), list):
+            item['public'] = [path_dispatch(x, root) for x in item['public']]
+
     # Write output to specified file
     print(json.dumps(args.description, indent=4), file=args.o)
 
+    # The sidecar is written last, so its modification time marks it as being
+    # up to date with the written description.
+    if args.sidecar:
+        args.o.flush()
+        gn.sidecar.write(args.sidecar, args.description)
+        args.sidecar.close()
+
     sys.exit(0)
 
 
@@ -24,30 +24,45 @@
 #
 
 import argparse
+import concurrent.futures
+import ctypes
+import functools
+import hashlib
+import json
 import os
+import re
+import shlex
 import sys
+import threading
 
-import clang.cindex
 import util
 import vfs
 
 import gn
 
+# The 'dependencies' backend works without libclang.
+try:
+    import clang.cindex
+except ImportError:
+    clang = None
+
 
 class CCAdapter:
-    def __init__(self, compile_command):
-        self._args = [
-            arg
-            for arg in compile_command.arguments
-            if arg != compile_command.filename
-        ]
+    def __init__(self, directory, filename, arguments):
+        self._args = [arg for arg in arguments if arg != filename]
 
-        self._args_set = set(self._args)
+        self._directory = directory
+        self._filename = filename
 
-        self._directory = compile_command.directory
-        self._filename = compile_command.filename
+    @classmethod
+    def from_entry(cls, entry):
+        arguments = entry.get('arguments')
+        if arguments is None:
+            arguments = shlex.split(entry['command'])
 
-    @property
+        return cls(entry['directory'], entry['file'], arguments)
+
+    @functools.cached_property
     def args(self):
         it = iter(self._args)
 
@@ -79,6 +94,10 @@ class CCAdapter:
 
         return args[1:]
 
+    @functools.cached_property
+    def _args_set(self):
+        return set(self._args)
+
     def contains(self, arg):
         return arg in self._args_set
 
@@ -90,7 +109,11 @@ class CCAdapter:
     def filename(self):
         return self._filename
 
-    @property
+    @functools.cached_property
+    def fingerprint(self):
+        return get_fingerprint(self._args)
+
+    @functools.cached_property
     def include_directories(self):
         it = iter(self._args)
 
@@ -104,16 +127,347 @@ class CCAdapter:
         return data
 
 
-class UnusedIncludeDirectoriesAnalysis:
-    def __init__(self, build_path, vfs_map, desc):
-        dirname = os.path.dirname(build_path)
+def get_fingerprint(args):
+    """
+    Return the canonical set of all definitions and include directories
+    within the arguments.
+
+    Separated and joined spellings, like '-I path' and '-Ipath', result in
+    the same fingerprint.
+    """
+    it = iter(args)
+
+    data = set()
+    while arg := next(it, None):
+        if arg in {'-D', '-I'}:
+            if value := next(it, None):
+                data.add(arg + value)
+        elif arg.startswith('-D'):
+            data.add(arg)
+        elif arg.startswith('-I') and arg != '-I-':
+            data.add('-I' + os.path.normpath(arg.removeprefix('-I')))
 
-        self.compilation_database = (
-            clang.cindex.CompilationDatabase.fromDirectory(dirname)
+    return frozenset(data)
+
+
+class CompileCommandIndex:
+    """
+    Look up the compile command of a source file matching a set of flags.
+
+    The compilation database is loaded only once. Commands are indexed by
+    their source file and by the fingerprint of their definitions and
+    include directories, so that a source compiled multiple times with
+    different configurations resolves without checking every candidate.
+    """
+
+    def __init__(self, path):
+        self.commands = {}
+        self.fingerprints = {}
+        self.matches = {}
+
+        with open(path, 'r') as file:
+            entries = json.load(file)
+
+        for entry in entries:
+            cc = CCAdapter.from_entry(entry)
+            source = os.path.abspath(os.path.join(cc.directory, cc.filename))
+
+            self.commands.setdefault(source, []).append(cc)
+            key = (source, cc.fingerprint)
+            self.fingerprints.setdefault(key, []).append(cc)
+
+    def _find(self, source, flags):
+        # Usually the definitions and include directories of the
+        # description narrow the candidates down to the commands sharing
+        # the same fingerprint. Fall back to checking all candidates if the
+        # toolchain adds further flags.
+        key = (source, get_fingerprint(flags))
+
+        for candidates in [
+            self.fingerprints.get(key, []),
+            self.commands.get(source, []),
+        ]:
+            for cc in candidates:
+                if all(cc.contains(x) for x in flags):
+                    return cc
+
+        return None
+
+    def get(self, source, flags):
+        key = (source, *flags)
+
+        if key not in self.matches:
+            self.matches[key] = self._find(source, flags)
+
+        return self.matches[key]
+
+
+def get_inclusions(tu):
+    """
+    Return the spelling and the included file of each inclusion directive
+    within the translation unit.
+    """
+    data = []
+
+    for cursor in tu.cursor.walk_preorder():
+        if cursor.kind != clang.cindex.CursorKind.INCLUSION_DIRECTIVE:
+            continue
+
+        # Command-line inclusions like '-include' do not have a valid
+        # source location.
+        if not cursor.location.file:
+            continue
+
+        # Absolute paths are files outside of the repository. Usually
+        # standard library headers. Short-circuit them.
+        if os.path.isabs(cursor.location.file.name):
+            continue
+
+        data.append([cursor.spelling, cursor.get_included_file().name])
+
+    return data
+
+
+def resolve_inclusion(spelling, directories, files):
+    """
+    Return the first file named by the spelling of an inclusion directive
+    within the given directories, as long as it is one of the given files.
+    """
+    for directory in directories:
+        path = os.path.normpath(os.path.join(directory, spelling))
+
+        if (value := files.get(path)) is not None:
+            return value
+
+    return None
+
+
+class DependencyScanner:
+    """
+    Retrieve inclusion directives without parsing translation units.
+
+    The files each translation unit depends on are taken from an existing
+    dependency scan. The spellings of all inclusion directives are scanned
+    from these files with a regular expression. Each spelling is resolved
+    like the preprocessor does, relative to the directory of the including
+    file for quoted inclusions and to the include directories in the order
+    of the compile command. Only dependencies of the translation unit are
+    considered, which ignores directives within inactive preprocessor
+    branches, as long as the file they name is not a dependency.
+    """
+
+    def __init__(self, dependencies):
+        self.regex = re.compile(
+            rb'^[ \t]*#[ \t]*(?:include|include_next|import)[ \t]*'
+            rb'([<"])([^>"\n]+)[>"]',
+            re.MULTILINE,
         )
+        self.dependencies = {}
+        self.spellings = {}
+
+        for entry in dependencies:
+            key = os.path.abspath(entry['main'])
+            deps = self.dependencies.setdefault(key, {})
+            deps.update(dict.fromkeys([entry['main'], *entry['deps']]))
+
+    def _get_spellings(self, path):
+        if (value := self.spellings.get(path)) is not None:
+            return value
+
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            data = b''
+
+        value = [
+            (x == b'"', y.decode('utf-8', errors='replace'))
+            for x, y in self.regex.findall(data)
+        ]
+        self.spellings[path] = value
+
+        return value
+
+    def get_inclusions(self, cc):
+        source = os.path.abspath(os.path.join(cc.directory, cc.filename))
+
+        deps = self.dependencies.get(source)
+        if deps is None:
+            message = f'unable to retrieve dependencies for "{source}"'
+            raise RuntimeError(message)
+
+        files = {os.path.abspath(x): x for x in deps}
+        include_dirs = [
+            os.path.abspath(os.path.join(cc.directory, x))
+            for x in cc.include_directories
+        ]
+
+        data = []
+        for path, name in files.items():
+            # Absolute paths are files outside of the repository. Usually
+            # standard library headers. Short-circuit them.
+            if os.path.isabs(name):
+                continue
+
+            for quoted, spelling in self._get_spellings(name):
+                directories = include_dirs
+                if quoted:
+                    directories = [os.path.dirname(path), *include_dirs]
+
+                if included := resolve_inclusion(spelling, directories, files):
+                    data.append([spelling, included])
+
+        return data
+
+
+class _CXString(ctypes.Structure):
+    _fields_ = [('data', ctypes.c_void_p), ('flags', ctypes.c_uint)]
+
+
+def get_libclang_version():
+    """Return the version string of the loaded libclang library."""
+    lib = clang.cindex.conf.lib
+
+    # The Python bindings do not expose this function. Fresh function
+    # pointers avoid interfering with the prototypes set up by the bindings.
+    get_version = lib['clang_getClangVersion']
+    get_version.restype = _CXString
+
+    get_string = lib['clang_getCString']
+    get_string.argtypes = [_CXString]
+    get_string.restype = ctypes.c_char_p
+
+    dispose = lib['clang_disposeString']
+    dispose.argtypes = [_CXString]
+    dispose.restype = None
+
+    value = get_version()
+    try:
+        return get_string(value).decode('utf-8', errors='replace')
+    finally:
+        dispose(value)
+
+
+class InclusionCache:
+    """
+    Cache the inclusion directives of parsed translation units.
+
+    Entries are keyed by the source file, its normalized compile arguments
+    and the salt, e.g. the libclang version. An entry is only valid as long
+    as the content of all files the translation unit depended on did not
+    change. If a directory is specified, entries are persisted on disk and
+    reused by later runs.
+    """
+
+    def __init__(self, path=None, salt=''):
+        self.path = path
+        self.salt = salt
+        self.entries = {}
+        self.digests = {}
+
+    def _get_digest(self, path):
+        if (value := self.digests.get(path)) is not None:
+            return value
+
+        try:
+            with open(path, 'rb') as file:
+                value = hashlib.file_digest(file, 'blake2b').hexdigest()
+        except OSError:
+            value = ''
+
+        self.digests[path] = value
+
+        return value
+
+    def _get_entry_path(self, key):
+        return os.path.join(self.path, key[:2], f'{key}.json')
+
+    def get_key(self, cc):
+        data = [self.salt, cc.directory, cc.filename, cc.args]
+        value = json.dumps(data).encode('utf-8')
+
+        return hashlib.blake2b(value, digest_size=20).hexdigest()
+
+    def load(self, key):
+        if (entry := self.entries.get(key)) is not None:
+            return entry['inclusions']
+
+        if not self.path:
+            return None
+
+        try:
+            with open(self._get_entry_path(key), 'r') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        for path, digest in entry['files'].items():
+            if self._get_digest(path) != digest:
+                return None
+
+        self.entries[key] = entry
+
+        return entry['inclusions']
+
+    def store(self, key, inclusions, files):
+        entry = {
+            'inclusions': inclusions,
+            'files': {x: self._get_digest(x) for x in files},
+        }
+
+        self.entries[key] = entry
+
+        if not self.path:
+            return
+
+        path = self._get_entry_path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            with open(tmp, 'w') as file:
+                json.dump(entry, file)
+
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+
+class AnalysisContext:
+    """
+    The state shared by the analyses of all targets within one process.
+
+    The compilation database is loaded only once. Each worker thread of the
+    'libclang' backend holds its own 'clang.cindex.Index', created on first
+    use and reused for all translation units parsed by that thread.
+    """
+
+    def __init__(self, build_path, vfs_map, cache_dir=None, scanner=None):
+        self.compile_commands = CompileCommandIndex(build_path)
         self.vfs_map = vfs_map
+        salt = get_libclang_version() if cache_dir and not scanner else ''
+
+        self.cache = InclusionCache(cache_dir, salt)
+        self.scanner = scanner
+        self.local = threading.local()
+
+    @property
+    def index(self):
+        if not hasattr(self.local, 'index'):
+            self.local.index = clang.cindex.Index.create()
+
+        return self.local.index
+
+
+class UnusedIncludeDirectoriesAnalysis:
+    def __init__(self, context, desc):
+        self.compile_commands = context.compile_commands
+        self.vfs_map = context.vfs_map
+        self.cache = context.cache
+        self.scanner = context.scanner
         self.desc = desc
-        self.index = clang.cindex.Index.create()
+        self.context = context
         self.used_include_dirs = set()
         self.provided_include_dirs = set()
 
@@ -152,48 +506,21 @@ class UnusedIncludeDirectoriesAnalysis:
         # include directories are the same between two compile commands, then
         # the performed analysis should generate correct results either way.
         source = os.path.abspath(source)
-        commands = (
-            CCAdapter(command)
-            for command in self.compilation_database.getCompileCommands(source)
-        )
-
         flags = self._get_desc_flags(source)
 
-        for command in commands:
-            if not all(command.contains(x) for x in flags):
-                continue
-
+        if (command := self.compile_commands.get(source, flags)) is not None:
             return command
 
         message = f'unable to retrieve compile command for "{source}"'
         raise RuntimeError(message)
 
-    def _analyze_translation_unit(self, tu):
-        # Search for each inclusion directive, retrieve the used include
-        # directory and store it.
-        for cursor in tu.cursor.walk_preorder():
-            if cursor.kind != clang.cindex.CursorKind.INCLUSION_DIRECTIVE:
-                continue
-
-            # Command-line inclusions like '-include' do not have a valid
-            # source location.
-            if not cursor.location.file:
-                continue
-
-            # Absolute paths are files outside of the repository. Usually
-            # standard library headers. Short-circuit them.
-            if os.path.isabs(cursor.location.file.name):
-                continue
-
-            # Path as written in the source code.
-            relative_path = cursor.spelling
-
-            # Complete path to included file.
-            full_path = cursor.get_included_file().name
-
+    def _analyze_inclusions(self, inclusions):
+        # Retrieve the used include directory of each inclusion directive
+        # and store it.
+        for relative_path, included_file in inclusions:
             # Make sure to get the original source file if a virtual file
             # system is used.
-            full_path = self.vfs_map.get_source(full_path, full_path)
+            full_path = self.vfs_map.get_source(included_file, included_file)
 
             # Deduce the used include directory.
             include_dir = full_path.removesuffix(relative_path)
@@ -210,16 +537,36 @@ class UnusedIncludeDirectoriesAnalysis:
         for path in cc.include_directories:
             self.provided_include_dirs.add(os.path.normpath(path))
 
-        tu = self.index.parse(
-            cc.filename,
-            args=cc.args,
-            options=(
+        if self.scanner:
+            self._analyze_inclusions(self.scanner.get_inclusions(cc))
+            return
+
+        key = self.cache.get_key(cc)
+
+        inclusions = self.cache.load(key)
+        if inclusions is None:
+            options = (
                 clang.cindex.TranslationUnit.PARSE_DETAILED_PROCESSING_RECORD
                 | clang.cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
-            ),
-        )
+            )
+
+            try:
+                tu = self.context.index.parse(
+                    cc.filename, args=cc.args, options=options
+                )
+            except clang.cindex.TranslationUnitLoadError as e:
+                message = f'unable to parse "{source}"'
+                raise RuntimeError(message) from e
+
+            inclusions = get_inclusions(tu)
 
-        self._analyze_translation_unit(tu)
+            # Remember all files the result depends on.
+            files = [tu.spelling] + [x.include.name for x in tu.get_includes()]
+            files = [os.path.join(cc.directory, x) for x in files]
+
+            self.cache.store(key, inclusions, files)
+
+        self._analyze_inclusions(inclusions)
 
     def run(self):
         sources = (
@@ -234,14 +581,68 @@ class UnusedIncludeDirectoriesAnalysis:
         return self.provided_include_dirs - self.used_include_dirs
 
 
+def report_unused_includes(target, desc, unused_includes):
+    entity = desc['metadata']['template'][0]
+
+    for include in sorted(unused_includes):
+        print(
+            f'{target}: error: {entity} contains unused include '
+            f'directory "{include}"',
+            file=sys.stderr,
+        )
+
+
+def check_args(parser, args):
+    if args.ack and len(args.ack) != len(args.target):
+        parser.error('the number of acks must match the number of targets')
+
+    if args.backend == 'dependencies' and not args.dependencies:
+        parser.error("the 'dependencies' backend requires --dependencies")
+
+    if args.backend == 'libclang' and not clang:
+        parser.error("the 'libclang' backend requires the libclang package")
+
+
 def main():
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--backend',
+        help=(
+            "The backend retrieving the inclusion directives. 'libclang' "
+            "parses each translation unit while 'dependencies' scans the "
+            'files listed by the dependency data. '
+            "Default is 'libclang'."
+        ),
+        choices=['libclang', 'dependencies'],
+        required=False,
+        default='libclang',
+        type=str,
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help=(
+            'Persist the inclusion directives of all parsed translation '
+            'units in the specified directory.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--compilation-database',
         help="The project's compilation database.",
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--dependencies',
+        help="The dependency data used by the 'dependencies' backend.",
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--vfs-config',
         help=(
@@ -260,18 +661,43 @@ def main():
     parser.add_argument(
         '--target',
         help=(
-            'The target of the entity getting analysed. Used for the diagnostic '
-            'message.'
+            'The targets of the entities getting analysed. Used for the '
+            'diagnostic messages.'
         ),
+        nargs='+',
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--ack',
+        help=(
+            'An acknowledgement file for each target, written once the '
+            'target passed the analysis.'
+        ),
+        nargs='*',
+        required=False,
+        default=[],
+        type=str,
+    )
+    parser.add_argument(
+        '--jobs',
+        '-j',
+        help=(
+            'Analyze the specified amount of targets in parallel. '
+            "Default is '1', since the build already runs multiple "
+            'processes in parallel.'
+        ),
+        required=False,
+        default=1,
+        type=int,
+    )
     parser.add_argument(
         '--exclude',
         help=(
             'Do not report unused include directores matching any of the '
             'specified globs.'
         ),
+        nargs='*',
         default=[],
         required=False,
         type=str,
@@ -279,27 +705,55 @@ def main():
 
     args = parser.parse_args()
 
-    desc = args.description[args.target]
+    check_args(parser, args)
 
-    analysis = UnusedIncludeDirectoriesAnalysis(
-        args.compilation_database, args.vfs_config, desc
-    )
+    exclude = util.GlobSet(args.exclude)
+    scanner = None
+    if args.backend == 'dependencies':
+        with open(args.dependencies, 'r') as file:
+            scanner = DependencyScanner(json.load(file))
 
-    unused_includes = [
-        include
-        for include in analysis.run()
-        if not util.any_fnmatch(include, args.exclude)
-    ]
+    context = AnalysisContext(
+        args.compilation_database, args.vfs_config, args.cache_dir, scanner
+    )
 
-    entity = desc['metadata']['template'][0]
-    for include in sorted(unused_includes):
-        print(
-            f'{args.target}: error: {entity} contains unused include '
-            f'directory "{include}"',
-            file=sys.stderr,
+    def analyze(target):
+        analysis = UnusedIncludeDirectoriesAnalysis(
+            context, args.description[target]
         )
 
-    exit_code = len(unused_includes) != 0
+        # A single target failing must not abort the analysis of all other
+        # targets within the batch.
+        try:
+            return [x for x in analysis.run() if not exclude.match(x)], None
+        except RuntimeError as e:
+            return [], e
+
+    acks = args.ack or [None] * len(args.target)
+    jobs = min(max(len(args.target), 1), args.jobs)
+    failed = 0
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(analyze, args.target)
+
+        for target, ack, (unused_includes, error) in zip(
+            args.target, acks, results, strict=True
+        ):
+            if error:
+                print(f'{target}: error: {error}', file=sys.stderr)
+                failed += 1
+                continue
+
+            desc = args.description[target]
+            report_unused_includes(target, desc, unused_includes)
+
+            if unused_includes:
+                failed += 1
+            elif ack:
+                with open(ack, 'w'):
+                    pass
+
+    exit_code = failed != 0
 
     sys.exit(exit_code)
 
@@ -46,10 +46,83 @@ class PathTransformer:
         return os.path.relpath(path, self.build_dir)
 
 
+def get_ack_path(label):
+    build_file = gn.label.get_referenced_build_file(label)
+    target = gn.label.get_name(label)
+    digest = xxhash.xxh3_128_hexdigest(build_file.encode('utf-8'))
+
+    return os.path.join(digest, f'{target}.ack')
+
+
+def write_rule(writer, args, transform):
+    cache_args = []
+    if args.cache_directory:
+        cache_args = ['--cache-dir', args.cache_directory]
+
+    # Only the 'libclang' backend parses translation units.
+    requirements = []
+    if args.backend == 'libclang':
+        requirements = ['--with', 'libclang']
+
+    backend_args = ['--backend', args.backend]
+    if args.dependencies:
+        backend_args += ['--dependencies', args.dependencies]
+
+    writer.rule(
+        name='invoke',
+        command=[
+            os.environ['UV'],
+            # Change the working directory to the original build directory so
+            # the relative paths in the builds description and the
+            # compilation database can be simply used.
+            '--directory',
+            transform(os.getcwd()),
+            'run',
+            *requirements,
+            'python',
+            args.script,
+            '--description',
+            args.description,
+            '--compilation-database',
+            args.compilation_database,
+            '--vfs-config',
+            args.vfs_config,
+            '--target',
+            '$targets',
+            '--ack',
+            '$acks',
+            *cache_args,
+            *backend_args,
+        ],
+        description='CHECK-INCLUDE-DIRS $targets',
+    )
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Generate an unused include directories analysis build.'
     )
+    parser.add_argument(
+        '--backend',
+        help=(
+            'The backend used by the invoked script to retrieve the inclusion '
+            "directives. Default is 'libclang'."
+        ),
+        choices=['libclang', 'dependencies'],
+        required=False,
+        default='libclang',
+        type=str,
+    )
+    parser.add_argument(
+        '--batch-size',
+        help=(
+            'The maximum amount of targets analyzed by a single invocation '
+            "of the script. Default is '16'."
+        ),
+        required=False,
+        default=16,
+        type=int,
+    )
     parser.add_argument(
         '--build-directory',
         help=(
@@ -78,6 +151,16 @@ def main():
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--cache-directory',
+        help=(
+            'The directory used by the invoked script to cache the results '
+            'of parsed translation units.'
+        ),
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--compilation-database',
         help=(
@@ -87,6 +170,14 @@ def main():
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--dependencies',
+        help="The dependency data used by the 'dependencies' backend.",
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=str,
+    )
     parser.add_argument(
         '--vfs-config',
         help=(
@@ -107,6 +198,12 @@ def main():
 
     args = parser.parse_args()
 
+    if args.backend == 'dependencies' and not args.dependencies:
+        parser.error("the 'dependencies' backend requires --dependencies")
+
+    exclude = util.GlobSet(args.exclude)
+    translation_units = util.GlobSet(['*.c', '*.cc', '*.cpp', '*.cxx'])
+
     desc = gn.Description.from_file(args.description).get_if(
         lambda data: (
             data['type']
@@ -124,71 +221,50 @@ def main():
     )
     writer.newline()
 
-    writer.rule(
-        name='invoke',
-        command=[
-            os.environ['UV'],
-            # Since we are using 'libclang', change the working directory to
-            # the original build directory so the relative paths in the builds
-            # description and the compilation database can be simply used.
-            '--directory',
-            transform(os.getcwd()),
-            'run',
-            '--with',
-            'libclang',
-            'python',
-            args.script,
-            '--description',
-            args.description,
-            '--compilation-database',
-            args.compilation_database,
-            '--vfs-config',
-            args.vfs_config,
-            '--target',
-            '$target',
-            '&&',
-            os.path.realpath(sys.executable),
-            '-c',
-            '\'open("$out", "w")\'',
-        ],
-        description='CHECK-INCLUDE-DIRS $target',
-    )
+    write_rule(writer, args, transform)
     writer.newline()
 
-    script = transform(args.script)
-    compilation_database = transform(args.compilation_database)
-    description = transform(args.description)
+    inputs = [
+        transform(args.script),
+        transform(args.compilation_database),
+        transform(args.description),
+    ]
+    if args.dependencies:
+        inputs.append(transform(args.dependencies))
+
+    labels = []
 
     for label, details in desc.items():
         # Do not create a build target for excluded labels.
-        if util.any_fnmatch(label, args.exclude):
+        if exclude.match(label):
             continue
 
         # Do not create a build target for components that do not contain a
         # a full translation unit.
-        sources = [
-            path
-            for path in details['sources']
-            if util.any_fnmatch(path, ['*.c', '*.cc', '*.cpp', '*.cxx'])
-        ]
-
-        if not sources:
+        if not translation_units.filter(details['sources']):
             continue
 
-        build_file = gn.label.get_referenced_build_file(label)
-        target = gn.label.get_name(label)
-        digest = xxhash.xxh3_128_hexdigest(build_file)
-        output = os.path.join(digest, f'{target}.ack')
+        labels.append(label)
+
+    # Analyze multiple targets within a single process to share the startup
+    # costs. Ninja still tracks the result of each target on its own.
+    batch_size = max(args.batch_size, 1)
+
+    for i in range(0, len(labels), batch_size):
+        targets = labels[i : i + batch_size]
+        outputs = [get_ack_path(x) for x in targets]
+
+        # The script runs within the original build directory.
+        acks = [os.path.join(args.build_directory, x) for x in outputs]
 
         writer.build(
-            outputs=[output],
+            outputs=outputs,
             rule='invoke',
-            variables={'target': label},
-            inputs=[
-                script,
-                compilation_database,
-                description,
-            ],
+            variables={
+                'targets': ' '.join(targets),
+                'acks': ' '.join(acks),
+            },
+            inputs=inputs,
         )
         writer.newline()
 
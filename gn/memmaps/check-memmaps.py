@@ -24,12 +24,12 @@
 #
 
 import argparse
-import itertools
-import json
 import sys
 
 import util
 
+import gn
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -42,7 +42,7 @@ def main():
         '--dependencies',
         help='A JSON file containing known file dependencies.',
         required=True,
-        type=lambda x: json.load(open(x, 'r')),
+        type=gn.Dependencies.from_file,
     )
     parser.add_argument(
         '--memmaps',
@@ -70,12 +70,12 @@ def main():
 
     args = parser.parse_args()
 
-    deps = itertools.chain(*(item['deps'] for item in args.dependencies))
+    include = util.GlobSet(args.include)
+    exclude = util.GlobSet(args.exclude)
+
+    deps = args.dependencies.union()
     memmaps = {
-        item
-        for item in deps
-        if util.any_fnmatch(item, args.include)
-        and not util.any_fnmatch(item, args.exclude)
+        item for item in deps if include.match(item) and not exclude.match(item)
     }
 
     missing = memmaps.difference(args.memmaps)
@@ -24,7 +24,6 @@
 #
 
 import argparse
-import json
 import sys
 
 import gn
@@ -47,14 +46,14 @@ def main():
         '--dependencies',
         help="A JSON file containing all of the project's dependencies.",
         required=True,
-        type=lambda x: json.load(open(x, 'r')),
+        type=gn.Dependencies.from_file,
     )
 
     args = parser.parse_args()
 
     # Extract all source and header files from the project's dependencies.
     # Use a set to avoid duplicates and reduce input size.
-    sources = {x for item in args.dependencies for x in item['deps']}
+    sources = args.dependencies.union()
 
     # Extract all files which are known to have metadata associated with them
     available = set(args.metadata.extract('source'))
@@ -61,6 +61,9 @@ def main():
 
     args = parser.parse_args()
 
+    include = util.GlobSet(args.include)
+    exclude = util.GlobSet(args.exclude)
+
     regex = re.compile(r'[a-z][a-z0-9]*(:?[-_][a-z][a-z0-9]*)*')
 
     scripts = set(
@@ -72,10 +75,7 @@ def main():
         ).extract(
             'inputs',
             flatten=True,
-            predicate=lambda x: (
-                util.any_fnmatch(x, args.include)
-                and not util.any_fnmatch(x, args.exclude)
-            ),
+            predicate=lambda x: include.match(x) and not exclude.match(x),
         )
     )
 
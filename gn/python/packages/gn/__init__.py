@@ -23,11 +23,26 @@
 # SOFTWARE.
 #
 
-from .lib import Description, Metadata, label, root
+from .lib import (
+    Dependencies,
+    Description,
+    Graph,
+    Metadata,
+    deps,
+    label,
+    root,
+    sidecar,
+    stream,
+)
 
 __all__ = [
+    'Dependencies',
     'Description',
+    'Graph',
     'Metadata',
+    'deps',
     'label',
     'root',
+    'sidecar',
+    'stream',
 ]
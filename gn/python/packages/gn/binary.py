@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+import array
+import mmap
+import os
+import struct
+import sys
+
+# Helpers shared by the binary, memory-mappable sidecars of JSON files. All
+# integers are unsigned 32-bit values in little-endian byte order.
+
+
+def sidecar_path(path):
+    """Return the path of the sidecar belonging to a JSON file."""
+    return os.path.splitext(path)[0] + '.bin'
+
+
+def pad(data):
+    """Pad the data to a multiple of 4 bytes."""
+    return data + bytes(-len(data) % 4)
+
+
+def pack_u32(values):
+    return struct.pack(f'<{len(values)}I', *values)
+
+
+class Reader:
+    """Consume consecutive sections of a buffer without copying them."""
+
+    def __init__(self, buffer, position):
+        self.view = memoryview(buffer)
+        self.position = position
+
+    def take(self, size):
+        if self.position + size > len(self.view):
+            message = 'truncated sidecar'
+            raise ValueError(message)
+
+        data = self.view[self.position : self.position + size]
+        self.position += size
+
+        return data
+
+    def take_u32(self, count):
+        data = self.take(4 * count)
+
+        # Integers are stored in little-endian byte order. Only decode them
+        # explicitly if the host disagrees, otherwise keep the zero-copy view.
+        if sys.byteorder == 'little':
+            return data.cast('I')
+
+        values = array.array('I')
+        values.frombytes(data)
+        values.byteswap()
+
+        return values
+
+
+def load(path, header, decode):
+    """Memory-map a sidecar and return the result of 'decode' for its
+    buffer. Returns None if the sidecar is unavailable, smaller than its
+    'header' or corrupted.
+    """
+    try:
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(buffer) < header.size:
+        return None
+
+    try:
+        return decode(buffer)
+    except (IndexError, TypeError, ValueError, struct.error):
+        return None
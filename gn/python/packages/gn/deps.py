@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import collections.abc
+import struct
+
+from . import binary
+
+# A dependencies sidecar is a binary, memory-mappable representation of the
+# dependency data of all translation units. Each path is stored only once.
+# It is laid out as follows, with all integers being unsigned 32-bit values
+# in little-endian byte order:
+#
+#   header      : magic, version, #strings, #dep-strings, #units,
+#                 #edge-bytes, #strings-bytes
+#   string table: offsets[#strings + 1], utf-8 encoded paths (padded)
+#   units       : the string index of the main file of each unit[#units]
+#   edge list   : offsets[#units + 1], encoded string indexes of deps
+#
+# The first '#dep-strings' strings are all paths occurring as a dependency,
+# so their union is available without decoding any edge. The deps of each
+# unit are stored in their original order as the zigzag-encoded differences
+# between consecutive string indexes, each difference being a varint.
+MAGIC = b'GNDEPS\0\0'
+VERSION = 2
+
+_HEADER = struct.Struct('<8s6I')
+
+# Each byte of a varint holds 7 bits of the value. The highest bit marks
+# that further bytes follow.
+_MORE = 0x80
+_BITS = 0x7F
+
+
+def encode(values):
+    """Encode a list of string indexes as varints."""
+    data = bytearray()
+    previous = 0
+
+    for value in values:
+        delta = value - previous
+        delta = 2 * delta if delta >= 0 else -2 * delta - 1
+        previous = value
+
+        while delta >= _MORE:
+            data.append(delta & _BITS | _MORE)
+            delta >>= 7
+
+        data.append(delta)
+
+    return data
+
+
+def decode(data):
+    """Decode a list of string indexes from varints."""
+    values = []
+    previous = 0
+    value = 0
+    shift = 0
+
+    for byte in data:
+        value |= (byte & _BITS) << shift
+        shift += 7
+
+        if byte & _MORE:
+            continue
+
+        previous += (value >> 1) ^ -(value & 1)
+        values.append(previous)
+        value = 0
+        shift = 0
+
+    return values
+
+
+def write(out, data):
+    """Write the sidecar of the specified dependency data to a binary
+    file.
+    """
+    ids = {}
+
+    for item in data:
+        for path in item['deps']:
+            ids.setdefault(path, len(ids))
+
+    ndeps = len(ids)
+
+    for item in data:
+        ids.setdefault(item['main'], len(ids))
+
+    mains = []
+    offsets = [0]
+    edges = bytearray()
+    for item in data:
+        mains.append(ids[item['main']])
+        edges += encode([ids[x] for x in item['deps']])
+        offsets.append(len(edges))
+
+    paths = [item.encode() for item in ids]
+    string_offsets = [0]
+    for item in paths:
+        string_offsets.append(string_offsets[-1] + len(item))
+
+    strings = binary.pad(b''.join(paths))
+
+    out.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(paths),
+            ndeps,
+            len(mains),
+            len(edges),
+            len(strings),
+        )
+    )
+    out.write(binary.pack_u32(string_offsets))
+    out.write(strings)
+    out.write(binary.pack_u32(mains))
+    out.write(binary.pack_u32(offsets))
+    out.write(edges)
+
+
+class Strings(collections.abc.Sequence):
+    """A read-only sequence of the paths within a memory-mapped sidecar.
+    Paths are decoded lazily and only once.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if (value := self.cache.get(i)) is None:
+            start, end = self.offsets[i], self.offsets[i + 1]
+            value = self.cache[i] = str(self.data[start:end], 'utf-8')
+
+        return value
+
+
+class Units(collections.abc.Sequence):
+    """A read-only sequence of the translation units within a memory-mapped
+    sidecar. Units are decoded on access.
+    """
+
+    def __init__(self, strings, ndeps, mains, offsets, edges):
+        self.strings = strings
+        self.ndeps = ndeps
+        self.mains = mains
+        self.offsets = offsets
+        self.edges = edges
+
+    def __len__(self):
+        return len(self.mains)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[x] for x in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        data = self.edges[self.offsets[i] : self.offsets[i + 1]]
+
+        return {
+            'main': self.strings[self.mains[i]],
+            'deps': [self.strings[x] for x in decode(data)],
+        }
+
+    def union(self):
+        """Return the set of all dependencies of all translation units."""
+        return {self.strings[i] for i in range(self.ndeps)}
+
+
+def _load(buffer):
+    header = _HEADER.unpack_from(buffer)
+    magic, version, nstrings, ndeps, nunits, nedges, nbytes = header
+
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    size = _HEADER.size + 4 * (nstrings + 2 * nunits + 2) + nbytes + nedges
+    if len(buffer) != size or ndeps > nstrings:
+        return None
+
+    reader = binary.Reader(buffer, _HEADER.size)
+
+    string_offsets = reader.take_u32(nstrings + 1)
+    strings = Strings(string_offsets, reader.take(nbytes))
+    mains = reader.take_u32(nunits)
+    offsets = reader.take_u32(nunits + 1)
+    edges = reader.take(nedges)
+
+    if string_offsets[-1] > nbytes or offsets[0] != 0 or offsets[-1] != nedges:
+        return None
+
+    if nunits and max(mains) >= nstrings:
+        return None
+
+    return Units(strings, ndeps, mains, offsets, edges)
+
+
+def load(path):
+    """Memory-map a sidecar and return its lazily decoded translation units.
+    Returns None if the sidecar is unavailable, incompatible or corrupted.
+    """
+    return binary.load(path, _HEADER, _load)
@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import array
+import collections
+import functools
+
+from . import label
+
+
+class Graph:
+    """A compact, indexed representation of the dependency graph of a build's
+    description.
+
+    Target labels are interned to integer IDs. Dependencies and their reverse
+    edges are kept in compressed adjacency arrays, where the edges of node 'i'
+    are stored within 'edges[offsets[i]:offsets[i + 1]]'.
+    """
+
+    # The default upper bound for the memory used by cached closures.
+    CLOSURE_CACHE_SIZE = 64 * 1024 * 1024
+
+    def __init__(self, labels, offsets, edges, roffsets, redges):
+        self.labels = labels
+        self.ids = {item: i for i, item in enumerate(labels)}
+        self.offsets = offsets
+        self.edges = edges
+        self.roffsets = roffsets
+        self.redges = redges
+
+        # Transitive closures of nodes stored as sorted arrays of node IDs in
+        # least recently used order.
+        self.closures = collections.OrderedDict()
+        self.closure_cache_size = Graph.CLOSURE_CACHE_SIZE
+        self.closure_cache_usage = 0
+
+    def __len__(self):
+        return len(self.labels)
+
+    @staticmethod
+    def from_desc(desc):
+        labels = list(desc)
+        ids = {item: i for i, item in enumerate(labels)}
+
+        offsets = array.array('I', [0])
+        edges = array.array('I')
+
+        for target in list(labels):
+            for item in desc[target]['deps']:
+                # Keys used to retrieve targets from the description are
+                # always without the toolchain label, so intern them this way.
+                dep = label.remove_toolchain(item)
+
+                i = ids.get(dep)
+                if i is None:
+                    i = ids[dep] = len(labels)
+                    labels.append(dep)
+
+                edges.append(i)
+
+            offsets.append(len(edges))
+
+        # Labels which are only referenced as a dependency do not have any
+        # outgoing edges.
+        offsets.extend([len(edges)] * (len(labels) + 1 - len(offsets)))
+
+        roffsets, redges = Graph._reverse(offsets, edges, len(labels))
+
+        return Graph(labels, offsets, edges, roffsets, redges)
+
+    @staticmethod
+    def _reverse(offsets, edges, size):
+        # Counting sort of all edges by their destination node.
+        counts = array.array('I', bytes(4 * (size + 1)))
+        for i in edges:
+            counts[i + 1] += 1
+
+        for i in range(size):
+            counts[i + 1] += counts[i]
+
+        roffsets = array.array('I', counts)
+        redges = array.array('I', bytes(4 * len(edges)))
+
+        for i in range(size):
+            for j in edges[offsets[i] : offsets[i + 1]]:
+                redges[counts[j]] = i
+                counts[j] += 1
+
+        return roffsets, redges
+
+    def get_id(self, target):
+        return self.ids[label.remove_toolchain(target)]
+
+    def get_label(self, i):
+        return self.labels[i]
+
+    def get_deps(self, i):
+        return self.edges[self.offsets[i] : self.offsets[i + 1]]
+
+    def get_rdeps(self, i):
+        return self.redges[self.roffsets[i] : self.roffsets[i + 1]]
+
+    def walk(self, roots, *, reverse=False):
+        """Return the IDs of all nodes reachable from the specified roots in
+        depth-first preorder. If 'reverse' is set, the reverse edges are
+        followed, yielding all nodes depending on the roots.
+        """
+        stack = list(roots)
+        visited = bytearray(len(self.labels))
+        offsets = self.roffsets if reverse else self.offsets
+        edges = self.redges if reverse else self.edges
+        nodes = []
+
+        while stack:
+            i = stack.pop()
+
+            if visited[i]:
+                continue
+
+            visited[i] = 1
+
+            stack += edges[offsets[i] : offsets[i + 1]]
+            nodes.append(i)
+
+        return nodes
+
+    @functools.cached_property
+    def _components(self):
+        """Return the strongly connected component of each node.
+
+        Components are numbered in reverse topological order, so the
+        dependencies of a component always have a smaller number.
+        """
+        components, _ = _Tarjan(self).run()
+
+        return components
+
+    def _cache_closure(self, i, closure):
+        self.closures[i] = closure
+        self.closure_cache_usage += closure.itemsize * len(closure)
+
+        while self.closure_cache_usage > self.closure_cache_size:
+            _, item = self.closures.popitem(last=False)
+            self.closure_cache_usage -= item.itemsize * len(item)
+
+    def _get_closure(self, root):
+        # Every node reachable from the root reaches a subset of the root's
+        # closure. The cached closure of such a node is therefore taken as a
+        # whole instead of walking its dependencies again.
+        closure = {root}
+        stack = [root]
+
+        while stack:
+            i = stack.pop()
+
+            for j in self.edges[self.offsets[i] : self.offsets[i + 1]]:
+                if j in closure:
+                    continue
+
+                if (cached := self.closures.get(j)) is not None:
+                    self.closures.move_to_end(j)
+                    closure.update(cached)
+                    continue
+
+                closure.add(j)
+                stack.append(j)
+
+        return array.array('I', sorted(closure))
+
+    def get_closures(self, roots):
+        """Return the transitive closure of each of the specified nodes as a
+        sorted array of the IDs of all reachable nodes.
+
+        Only the closures of the specified nodes are computed. Closures of
+        previous queries are reused where possible. The nodes of a batch are
+        processed in topological order, so that nodes depending on each
+        other within the batch share their work.
+        """
+        roots = list(roots)
+        order = dict.fromkeys(roots)
+
+        if len(order) > 1:
+            order = sorted(order, key=self._components.__getitem__)
+
+        closures = {}
+        for i in order:
+            if (closure := self.closures.get(i)) is not None:
+                self.closures.move_to_end(i)
+            else:
+                closure = self._get_closure(i)
+                self._cache_closure(i, closure)
+
+            closures[i] = closure
+
+        return [closures[i] for i in roots]
+
+
+class _Tarjan:
+    """An iterative version of Tarjan's strongly connected components
+    algorithm. Recursion is avoided as dependency chains may easily exceed
+    Python's recursion limit.
+    """
+
+    def __init__(self, graph):
+        size = len(graph)
+
+        self.graph = graph
+        self.index = [-1] * size
+        self.low = [0] * size
+        self.onstack = bytearray(size)
+        self.stack = []
+        self.components = array.array('I', bytes(4 * size))
+        self.count = 0
+        self.counter = 0
+
+    def _push(self, v):
+        self.index[v] = self.low[v] = self.counter
+        self.counter += 1
+        self.stack.append(v)
+        self.onstack[v] = 1
+
+    def _pop_component(self, v):
+        while True:
+            w = self.stack.pop()
+            self.onstack[w] = 0
+            self.components[w] = self.count
+
+            if w == v:
+                break
+
+        self.count += 1
+
+    def _visit(self, root):
+        offsets = self.graph.offsets
+        edges = self.graph.edges
+        index = self.index
+        low = self.low
+
+        self._push(root)
+        work = [[root, offsets[root]]]
+
+        while work:
+            frame = work[-1]
+            v, position = frame
+
+            if position < offsets[v + 1]:
+                frame[1] += 1
+                w = edges[position]
+
+                if index[w] == -1:
+                    self._push(w)
+                    work.append([w, offsets[w]])
+                elif self.onstack[w]:
+                    low[v] = min(low[v], index[w])
+
+                continue
+
+            work.pop()
+
+            if work:
+                u = work[-1][0]
+                low[u] = min(low[u], low[v])
+
+            if low[v] == index[v]:
+                self._pop_component(v)
+
+    def run(self):
+        for v in range(len(self.graph)):
+            if self.index[v] == -1:
+                self._visit(v)
+
+        return self.components, self.count
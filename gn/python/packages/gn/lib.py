@@ -23,27 +23,82 @@
 # SOFTWARE.
 #
 
+import collections.abc
 import functools
 import itertools
 import json
 import os
 
-from . import label
+from . import binary, deps, label, sidecar, stream
+from .graph import Graph
 
 
 class Description:
-    def __init__(self, desc):
-        self.desc = dict(desc)
+    def __init__(self, desc, *, graph=None):
+        # Plain dicts are copied so the description never aliases the
+        # caller's data. Other mappings like the lazily decoded targets of a
+        # sidecar are read-only and used as they are to avoid decoding all
+        # targets up front.
+        if isinstance(desc, dict) or not isinstance(
+            desc, collections.abc.Mapping
+        ):
+            desc = dict(desc)
+
+        self.desc = desc
+        self.graph = graph
 
     def __len__(self):
         return len(self.desc)
 
     @staticmethod
-    def from_file(path):
+    def from_file(path, *, indexed=False, predicate=None):
+        """Load a description from a file. If a predicate is specified, only
+        targets for which it is true are kept. Targets are then decoded
+        incrementally, so discarded targets never reside in memory together.
+        """
+        # Prefer the memory-mapped sidecar if it is up to date. It provides
+        # the indexed graph for free and only decodes accessed targets.
+        binpath = binary.sidecar_path(path)
+        if (
+            os.path.isfile(binpath)
+            and os.stat(binpath).st_mtime_ns >= os.stat(path).st_mtime_ns
+            and (data := sidecar.load(binpath))
+        ):
+            graph, desc = data
+            desc = Description(desc, graph=graph)
+
+            if predicate:
+                desc = desc.get_if(predicate)
+
+            return desc
+
         with open(path, 'r') as f:
-            desc = json.load(f)
+            if predicate:
+                desc = {
+                    target: data
+                    for target, data in stream.iter_object(f)
+                    if predicate(data)
+                }
+            else:
+                desc = json.load(f)
+
+        desc = Description(desc)
+
+        if indexed:
+            desc = desc.indexed()
+
+        return desc
+
+    def indexed(self):
+        """Return the description backed by an indexed dependency graph.
 
-        return Description(desc)
+        Building the graph has a one-time cost, but allows subsequent graph
+        queries to work on integer IDs instead of repeatedly parsing labels.
+        """
+        if self.graph is not None:
+            return self
+
+        return Description(self.desc, graph=Graph.from_desc(self.desc))
 
     @property
     def data(self):
@@ -70,7 +125,8 @@ class Description:
                 target: data
                 for target, data in self.desc.items()
                 if predicate(data)
-            }
+            },
+            graph=self.graph,
         )
 
     def extract_targets(self, *, predicate=bool):
@@ -90,6 +146,9 @@ class Description:
         """Return a description containing the specified target and all of its
         recursively related dependencies.
         """
+        if self.graph is not None:
+            return self._get_subdesc_indexed(target, predicate=predicate)
+
         deps = [label.remove_toolchain(target)]
         values = {}
         visited = set()
@@ -113,37 +172,300 @@ class Description:
 
         return Description(values)
 
+    def _get_subdesc_indexed(self, target, *, predicate=bool):
+        labels = self.graph.labels
+        values = {}
+
+        for i in self.graph.walk([self.graph.get_id(target)]):
+            target = labels[i]
+
+            data = self.desc[target]
+
+            if predicate(data):
+                values[target] = data
+
+        return Description(values, graph=self.graph)
+
+    def get_subdescs(self, targets, *, predicate=bool):
+        """Return a mapping of each specified target to a description
+        containing the target and all of its recursively related dependencies.
+
+        In contrast to get_subdesc(), the transitive closures are memoized
+        and shared across targets and subsequent calls. The targets within
+        each returned description are ordered as in this description.
+        """
+        graph = self._get_graph()
+        targets = list(targets)
+        closures = graph.get_closures([graph.get_id(x) for x in targets])
+        data = {}
+
+        for target, closure in zip(targets, closures, strict=True):
+            values = {}
+
+            for i in closure:
+                name = graph.labels[i]
+                value = self.desc[name]
+
+                if predicate(value):
+                    values[name] = value
+
+            data[target] = Description(values, graph=graph)
+
+        return data
+
+    def _get_graph(self):
+        if self.graph is None:
+            self.graph = Graph.from_desc(self.desc)
+
+        return self.graph
+
+    @functools.cached_property
+    def _file_lookup(self):
+        graph = self._get_graph()
+        lookup = {}
+
+        for target, data in self.desc.items():
+            i = graph.get_id(target)
+
+            for key in ['sources', 'public', 'inputs']:
+                # An unspecified list of public headers is reported as '*'.
+                paths = data.get(key) or []
+                if isinstance(paths, str):
+                    continue
+
+                for path in paths:
+                    lookup.setdefault(os.path.normpath(path), []).append(i)
+
+        return lookup
+
+    def _get_rdesc(self, roots, predicate):
+        labels = self._get_graph().labels
+        values = {}
+
+        for i in self.graph.walk(roots, reverse=True):
+            target = labels[i]
+
+            # Dependent targets may have been filtered from this description.
+            data = self.desc.get(target)
+
+            if data is not None and predicate(data):
+                values[target] = data
+
+        return Description(values, graph=self.graph)
+
+    def get_rdeps(self, target, *, predicate=bool):
+        """Return a description containing the specified target and all
+        targets which recursively depend on it.
+        """
+        return self._get_rdesc([self._get_graph().get_id(target)], predicate)
+
+    def get_affected(self, files, *, predicate=bool):
+        """Return a description containing all targets which list one of the
+        specified files and all targets which recursively depend on them.
+
+        Like 'gn analyze', a changed build file affects all targets.
+        """
+        files = list(files)
+
+        if any(
+            os.path.basename(x) == '.gn'
+            or os.path.splitext(x)[1] in {'.gn', '.gni'}
+            for x in files
+        ):
+            return self.get_if(predicate)
+
+        roots = itertools.chain.from_iterable(
+            self._file_lookup.get(os.path.normpath(path), []) for path in files
+        )
+
+        return self._get_rdesc(roots, predicate)
+
+
+class Dependencies:
+    """The files each translation unit of the project depends on.
+
+    Iterating yields an item with the 'main' file and its 'deps' for each
+    translation unit, just like the items of the JSON file.
+    """
+
+    def __init__(self, units=()):
+        if not isinstance(units, collections.abc.Sequence):
+            units = list(units)
+
+        self.units = units
+
+    def __len__(self):
+        return len(self.units)
+
+    def __iter__(self):
+        return iter(self.units)
+
+    @staticmethod
+    def from_file(path):
+        """Load the dependencies from a file."""
+        # Prefer the memory-mapped sidecar if it is up to date. It stores
+        # each path only once and decodes units only when accessed.
+        binpath = binary.sidecar_path(path)
+        if (
+            os.path.isfile(binpath)
+            and os.stat(binpath).st_mtime_ns >= os.stat(path).st_mtime_ns
+            and (units := deps.load(binpath))
+        ):
+            return Dependencies(units)
+
+        with open(path, 'r') as f:
+            return Dependencies(json.load(f))
+
+    @property
+    def data(self):
+        return list(self)
+
+    def union(self):
+        """Return the set of all dependencies of all translation units.
+
+        With a sidecar, only the distinct paths are decoded.
+        """
+        if isinstance(self.units, deps.Units):
+            return self.units.union()
+
+        return {x for item in self.units for x in item['deps']}
+
+    def get_impact_index(self, metadata=None):
+        """Return a mapping of each dependency to the translation units
+        depending on it.
+
+        If metadata is specified, each entry also lists the targets to which
+        these translation units belong.
+        """
+        units = {}
+        for item in self.units:
+            for path in item['deps']:
+                units.setdefault(path, {})[item['main']] = None
+
+        targets = {}
+        index = {}
+
+        for path, mains in units.items():
+            entry = index[path] = {'units': list(mains)}
+
+            if metadata is None:
+                continue
+
+            for main in mains:
+                if main not in targets:
+                    items = metadata.get_if(source=main)
+                    targets[main] = list(dict.fromkeys(items.extract('target')))
+
+            entry['targets'] = sorted({x for y in mains for x in targets[y]})
+
+        return index
+
+
+def _key(value):
+    # Distinguish values comparing equal across types, e.g. 'True' and '1'.
+    # Unhashable values like lists are compared by their JSON encoding.
+    if isinstance(value, (list, dict)):
+        return type(value), json.dumps(value, sort_keys=True)
+
+    return type(value), value
+
 
 class Metadata:
-    def __init__(self, metadata):
+    """The metadata of all sources.
+
+    Items are kept as they are. A hash index of an attribute is built the
+    first time items are selected by its value and reused by later queries.
+    """
+
+    def __init__(self, metadata=()):
         self.metadata = list(metadata)
+        self.indexes = {}
+
+    def __len__(self):
+        return len(self.metadata)
 
     def __iter__(self):
         return iter(self.metadata)
 
     @staticmethod
-    def from_file(path):
+    def from_file(path, *, predicate=None):
+        """Load metadata from a file. If a predicate is specified, only items
+        for which it is true are kept. Items are then decoded incrementally,
+        so discarded items never reside in memory together.
+        """
         with open(path, 'r') as f:
-            metadata = json.load(f)
+            if predicate:
+                metadata = (
+                    item for item in stream.iter_array(f) if predicate(item)
+                )
+            else:
+                metadata = json.load(f)
 
-        return Metadata(metadata)
+            return Metadata(metadata)
 
     @property
     def data(self):
         return self.metadata
 
-    def get_if(self, predicate):
-        return Metadata(item for item in self.metadata if predicate(item))
+    def _get_index(self, attribute):
+        index = self.indexes.get(attribute)
+
+        if index is None:
+            index = self.indexes[attribute] = {}
+
+            for i, item in enumerate(self.metadata):
+                if attribute in item:
+                    key = _key(item[attribute])
+                    index.setdefault(key, []).append(i)
+
+        return index
+
+    def _get_rows(self, attributes):
+        """Return the items matching all of the specified attribute values.
+
+        Candidates are taken from the smallest matching index and then
+        checked against the remaining attribute values.
+        """
+        if not attributes:
+            return range(len(self.metadata))
+
+        matches = [
+            (self._get_index(key).get(_key(value), []), key, _key(value))
+            for key, value in attributes.items()
+        ]
+        matches.sort(key=lambda x: len(x[0]))
+
+        rows = matches[0][0]
+        for _, key, value in matches[1:]:
+            items = self.metadata
+            rows = [i for i in rows if _key(items[i].get(key, _key)) == value]
+
+        return rows
+
+    def get_if(self, predicate=None, **attributes):
+        """Return the metadata of all items having the specified attribute
+        values and for which the specified predicate is true.
+
+        Attribute values are looked up through the indexes, so the predicate
+        is only evaluated for the remaining items.
+        """
+        items = (self.metadata[i] for i in self._get_rows(attributes))
+
+        if predicate:
+            items = (item for item in items if predicate(item))
+
+        return Metadata(items)
 
     def extract(self, attribute):
         return (item[attribute] for item in self.metadata)
 
-    @functools.cached_property
-    def _path_lookup(self):
-        return {item['source']: item for item in self.metadata}
-
     def get_file_metadata(self, path):
-        return self._path_lookup[path]
+        rows = self._get_rows({'source': path})
+        if not rows:
+            raise KeyError(path)
+
+        # Sources listed by multiple targets resolve to the last item.
+        return self.metadata[rows[-1]]
 
     def get_file_attribute(self, path, attribute):
         return self.get_file_metadata(path)[attribute]
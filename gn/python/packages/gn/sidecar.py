@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import collections.abc
+import itertools
+import json
+import struct
+
+from . import binary
+from .graph import Graph
+
+# A description sidecar is a binary, memory-mappable representation of a
+# dispatched description. It is laid out as follows, with all integers being
+# unsigned 32-bit values in little-endian byte order:
+#
+#   header      : magic, version, #nodes, #targets, #edges, #strings-bytes,
+#                 #attribute-bytes
+#   string table: offsets[#nodes + 1], utf-8 encoded labels (padded)
+#   target table: offsets[#targets + 1] into the attribute data
+#   edge list   : offsets[#nodes + 1], edges[#edges]
+#   reverse list: offsets[#nodes + 1], edges[#edges]
+#   attributes  : the JSON encoded attributes of each target
+#
+# The first '#targets' nodes are the targets of the description. Remaining
+# nodes are labels which are only referenced as a dependency.
+MAGIC = b'GNDESC\0\0'
+VERSION = 1
+
+_HEADER = struct.Struct('<8s6I')
+
+
+def write(out, desc, graph=None):
+    """Write the sidecar of the specified description to a binary file."""
+    if graph is None:
+        graph = Graph.from_desc(desc)
+
+    labels = [item.encode() for item in graph.labels]
+    string_offsets = [0]
+    for item in labels:
+        string_offsets.append(string_offsets[-1] + len(item))
+
+    attributes = [
+        json.dumps(desc[item], separators=(',', ':')).encode()
+        for item in graph.labels[: len(desc)]
+    ]
+    attribute_offsets = [0]
+    for item in attributes:
+        attribute_offsets.append(attribute_offsets[-1] + len(item))
+
+    strings = binary.pad(b''.join(labels))
+    data = b''.join(attributes)
+
+    out.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            len(graph),
+            len(desc),
+            len(graph.edges),
+            len(strings),
+            len(data),
+        )
+    )
+    out.write(binary.pack_u32(string_offsets))
+    out.write(strings)
+    out.write(binary.pack_u32(attribute_offsets))
+    out.write(binary.pack_u32(graph.offsets))
+    out.write(binary.pack_u32(graph.edges))
+    out.write(binary.pack_u32(graph.roffsets))
+    out.write(binary.pack_u32(graph.redges))
+    out.write(data)
+
+
+class Targets(collections.abc.Mapping):
+    """A read-only mapping of target labels to their attributes. Attributes
+    are decoded lazily from the memory-mapped sidecar on first access.
+    """
+
+    def __init__(self, graph, offsets, data):
+        self.graph = graph
+        self.offsets = offsets
+        self.data = data
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(self.graph.labels[: len(self)])
+
+    def __contains__(self, target):
+        return self.graph.ids.get(target, len(self)) < len(self)
+
+    def __getitem__(self, target):
+        if (value := self.cache.get(target)) is not None:
+            return value
+
+        i = self.graph.ids.get(target, len(self))
+        if i >= len(self):
+            raise KeyError(target)
+
+        value = json.loads(
+            bytes(self.data[self.offsets[i] : self.offsets[i + 1]])
+        )
+        self.cache[target] = value
+
+        return value
+
+
+def _get_size(header):
+    """Return the expected size of a sidecar in bytes."""
+    _, _, nodes, targets, edges, nstrings, ndata = header
+
+    return (
+        _HEADER.size
+        + 4 * (3 * (nodes + 1) + (targets + 1) + 2 * edges)
+        + nstrings
+        + ndata
+    )
+
+
+def _check_offsets(offsets, size):
+    if offsets[0] != 0 or offsets[-1] != size:
+        message = 'invalid sidecar offsets'
+        raise ValueError(message)
+
+
+def _load(buffer):
+    header = _HEADER.unpack_from(buffer)
+    magic, version, nodes, targets, edges, nstrings, ndata = header
+
+    if magic != MAGIC or version != VERSION:
+        return None
+
+    if len(buffer) != _get_size(header) or targets > nodes:
+        return None
+
+    reader = binary.Reader(buffer, _HEADER.size)
+
+    string_offsets = reader.take_u32(nodes + 1)
+    strings = reader.take(nstrings)
+    attribute_offsets = reader.take_u32(targets + 1)
+
+    # The adjacency arrays of the edges and of the reverse edges.
+    tables = [reader.take_u32(x) for x in [nodes + 1, edges, nodes + 1, edges]]
+
+    _check_offsets(attribute_offsets, ndata)
+    _check_offsets(tables[0], edges)
+    _check_offsets(tables[2], edges)
+
+    if string_offsets[-1] > nstrings:
+        return None
+
+    if edges and max(itertools.chain(tables[1], tables[3])) >= nodes:
+        return None
+
+    labels = [
+        str(strings[string_offsets[i] : string_offsets[i + 1]], 'utf-8')
+        for i in range(nodes)
+    ]
+    graph = Graph(labels, *tables)
+
+    return graph, Targets(graph, attribute_offsets, reader.take(ndata))
+
+
+def load(path):
+    """Memory-map a sidecar and return its graph and the lazily decoded
+    targets. Returns None if the sidecar is unavailable, incompatible or
+    corrupted.
+    """
+    return binary.load(path, _HEADER, _load)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_SEPARATOR = re.compile(r'[ \t\n\r]*([,\]}])')
+_NUMBER = '+-.0123456789Ee'
+
+
+class _Reader:
+    """A buffered reader to incrementally decode JSON values from a file."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        # Drop already consumed data to keep the buffer small.
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+
+            if not self._fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            message = (
+                f"expected one of '{chars}' but found '{char or 'EOF'}' "
+                f"in '{self.f.name}'"
+            )
+            raise ValueError(message)
+
+        self.position += 1
+
+        return char
+
+    def decode(self):
+        """Decode the next JSON value."""
+        self.peek()
+
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+
+                raise
+
+            # A number might have been truncated by the end of the buffer,
+            # e.g. '1.5e3' might have been decoded as '1'.
+            if (
+                end == len(self.buffer) or self.buffer[end] in _NUMBER
+            ) and self._fill():
+                continue
+
+            self.position = end
+
+            return value
+
+    def decode_item(self, closing):
+        """Decode the next item of an array or object including its trailing
+        separator. Returns the item and whether it was the last one.
+        """
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+
+            # Fast path: a complete item is followed by a separator within the
+            # buffer, which also rules out truncated numbers.
+            try:
+                value, end = _DECODER.scan_once(self.buffer, self.position)
+                match = _SEPARATOR.match(self.buffer, end)
+            except (StopIteration, json.JSONDecodeError):
+                match = None
+
+            if match and match.group(1) in {',', closing}:
+                self.position = match.end()
+
+                return value, match.group(1) == closing
+
+            if not self._fill():
+                break
+
+        return self.decode(), self.expect(f',{closing}') == closing
+
+
+def iter_array(f, *, chunk_size=1 << 16):
+    """Incrementally decode the items of a JSON array at the top level of the
+    specified file. Only a single item is held in memory at a time.
+    """
+    reader = _Reader(f, chunk_size)
+    reader.expect('[')
+
+    if reader.peek() == ']':
+        return
+
+    while True:
+        value, last = reader.decode_item(']')
+
+        yield value
+
+        if last:
+            return
+
+
+def iter_object(f, *, chunk_size=1 << 16):
+    """Incrementally decode the key-value pairs of a JSON object at the top
+    level of the specified file. Only a single pair is held in memory at a
+    time.
+    """
+    reader = _Reader(f, chunk_size)
+    reader.expect('{')
+
+    if reader.peek() == '}':
+        return
+
+    while True:
+        key = reader.decode()
+        reader.expect(':')
+
+        value, last = reader.decode_item('}')
+
+        yield key, value
+
+        if last:
+            return
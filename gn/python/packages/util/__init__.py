@@ -23,6 +23,7 @@
 # SOFTWARE.
 #
 
-from .lib import any_fnmatch, invoke_split
+from .lib import GlobSet, invoke_split
+from .runner import Job, Runner
 
-__all__ = ['any_fnmatch', 'invoke_split']
+__all__ = ['GlobSet', 'Job', 'Runner', 'invoke_split']
@@ -24,10 +24,68 @@
 #
 
 import fnmatch
+import os
+import re
 
+# Matching is case-insensitive on platforms normalizing the case of paths.
+_NORMCASE = os.path.normcase('A') != 'A'
 
-def any_fnmatch(data, globs, *, key=lambda x: x):
-    return any(fnmatch.fnmatch(key(data), glob) for glob in globs)
+
+class GlobSet:
+    """A set of glob patterns with the semantics of 'fnmatch.fnmatch'.
+
+    All patterns are compiled into a single regular expression once. Patterns
+    like '*.c' which only match a literal suffix bypass the regular expression
+    and are checked with a single 'str.endswith' call.
+    """
+
+    def __init__(self, globs=()):
+        suffixes = []
+        patterns = []
+
+        for item in globs:
+            glob = os.path.normcase(item) if _NORMCASE else item
+
+            if glob.startswith('*') and not any(x in glob[1:] for x in '*?['):
+                suffixes.append(glob[1:])
+            else:
+                patterns.append(fnmatch.translate(glob))
+
+        self.suffixes = tuple(suffixes)
+        self.regex = re.compile('|'.join(patterns)) if patterns else None
+
+    def __bool__(self):
+        return bool(self.suffixes) or self.regex is not None
+
+    def match(self, item):
+        """Return whether the item matches at least one of the globs."""
+        if _NORMCASE:
+            item = os.path.normcase(item)
+
+        if item.endswith(self.suffixes):
+            return True
+
+        return self.regex is not None and self.regex.match(item) is not None
+
+    def filter(self, iterable, *, key=None):
+        """Return all items matching at least one of the globs."""
+        if key:
+            return [x for x in iterable if self.match(key(x))]
+
+        return [x for x in iterable if self.match(x)]
+
+    def partition(self, iterable, *, key=None):
+        """Return the items matching and not matching any of the globs."""
+        matches = []
+        mismatches = []
+
+        for item in iterable:
+            if self.match(key(item) if key else item):
+                matches.append(item)
+            else:
+                mismatches.append(item)
+
+        return matches, mismatches
 
 
 def invoke_split(data, sep, *, maxsplit=-1):
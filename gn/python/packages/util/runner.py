@@ -0,0 +1,464 @@
+#!/usr/bin/env python
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# The unit of 'ru_maxrss' is bytes on macOS and kibibytes everywhere else.
+_MAXRSS_SCALE = 1 if sys.platform == 'darwin' else 1024
+
+
+class Job:
+    """
+    A single command executed by the 'Runner'.
+
+    The optional 'prepare' callable may return an 'argparse.Namespace' with
+    an 'exit_code' and an 'output' to skip the execution of the command,
+    e.g. if the result is already cached. The optional 'finish' callable
+    receives the result of a command that ran to completion. Both are called
+    in a worker thread. The 'estimate' is the expected wall time of the job.
+    """
+
+    def __init__(
+        self, name, command, *, estimate=0.0, prepare=None, finish=None
+    ):
+        self.name = name
+        self.command = command
+        self.estimate = estimate
+        self.prepare = prepare
+        self.finish = finish
+
+
+class _Process:
+    """
+    A subprocess whose resource usage is collected with 'os.wait4()'.
+
+    The interface matches the subset of 'asyncio.subprocess.Process' used by
+    the 'Runner'. Where available, the exit of the process is awaited with a
+    pidfd. Otherwise a worker thread blocks in 'os.waitid()'.
+    """
+
+    def __init__(self, command):
+        self.popen = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        self.returncode = None
+        self.rusage = None
+        self.stdout = asyncio.StreamReader()
+        self.transport = None
+        self.exit = asyncio.ensure_future(self._wait_exit())
+
+    @classmethod
+    async def create(cls, command):
+        loop = asyncio.get_running_loop()
+        process = cls(command)
+
+        process.transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(process.stdout),
+            process.popen.stdout,
+        )
+
+        return process
+
+    async def _wait_pidfd(self):
+        loop = asyncio.get_running_loop()
+        fd = os.pidfd_open(self.popen.pid)
+        future = loop.create_future()
+
+        loop.add_reader(fd, future.set_result, None)
+        try:
+            await future
+        finally:
+            loop.remove_reader(fd)
+            os.close(fd)
+
+    async def _wait_exit(self):
+        try:
+            await self._wait_pidfd()
+        except (AttributeError, OSError):
+            await asyncio.to_thread(
+                os.waitid, os.P_PID, self.popen.pid, os.WEXITED | os.WNOWAIT
+            )
+
+        _, status, self.rusage = os.wait4(self.popen.pid, 0)
+        self.returncode = os.waitstatus_to_exitcode(status)
+
+        # Keep 'subprocess.Popen' from reaping the process a second time.
+        self.popen.returncode = self.returncode
+
+    async def wait(self):
+        await asyncio.shield(self.exit)
+
+        # Any output not consumed by now is discarded.
+        self.transport.close()
+
+        return self.returncode
+
+    def terminate(self):
+        self.popen.terminate()
+
+    def kill(self):
+        self.popen.kill()
+
+
+async def _create_process(command):
+    if hasattr(os, 'wait4') and (
+        hasattr(os, 'pidfd_open') or hasattr(os, 'waitid')
+    ):
+        return await _Process.create(command)
+
+    return await asyncio.create_subprocess_exec(
+        *command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+
+async def _read_lines(reader):
+    while True:
+        try:
+            yield await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                yield e.partial
+
+            return
+        except asyncio.LimitOverrunError as e:
+            # Hand out overly long lines in pieces.
+            yield await reader.readexactly(e.consumed)
+
+
+class Runner:
+    """
+    Run jobs as subprocesses with a bounded amount of parallelism.
+
+    Jobs are started in the given order. The output of each job is collected
+    and handed to a callback as soon as the job completed. Once 'keep_going'
+    jobs failed, or the callback returned False, all queued jobs are
+    cancelled and all running subprocesses are terminated. Subprocesses
+    which do not exit within the grace period get killed.
+    """
+
+    GRACE_PERIOD = 2.0
+
+    def __init__(
+        self, mnemonic, *, jobs=None, keep_going=1, timeout=None, max_load=None
+    ):
+        self.mnemonic = mnemonic
+        self.jobs = max(jobs or os.cpu_count(), 1)
+        self.keep_going = keep_going
+        self.timeout = timeout
+        self.max_load = max_load
+        self.grace_period = Runner.GRACE_PERIOD
+        self.running = 0
+        self.consumed = 0.0
+        self.slots = []
+        self.tstart = 0.0
+        self.children = None
+
+    async def _throttle(self):
+        if not self.max_load:
+            return
+
+        # Always keep at least one job running to guarantee progress.
+        while self.running > 0 and os.getloadavg()[0] > self.max_load:
+            await asyncio.sleep(0.5)
+
+    async def _terminate(self, process):
+        try:
+            process.terminate()
+        except ProcessLookupError:
+            return
+
+        try:
+            await asyncio.wait_for(process.wait(), self.grace_period)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+
+    def _get_children_usage(self):
+        if not resource:
+            return None
+
+        # Without 'os.wait4()' the usage of a single child is not available.
+        # The growth of the usage of all reaped children since the previous
+        # observation is attributed to the child that exited last instead.
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        previous, self.children = self.children, usage
+
+        return argparse.Namespace(
+            ru_utime=usage.ru_utime - previous.ru_utime,
+            ru_stime=usage.ru_stime - previous.ru_stime,
+            ru_maxrss=0,
+        )
+
+    async def _execute(self, command, buffer):
+        process = await _create_process(command)
+        tstart = time.monotonic()
+        self.running += 1
+
+        try:
+            async with asyncio.timeout(self.timeout):
+                async for line in _read_lines(process.stdout):
+                    buffer.append(line)
+
+                exit_code = await process.wait()
+        except TimeoutError:
+            await self._terminate(process)
+            exit_code = None
+            buffer.append(f'error: timed out after {self.timeout}s\n'.encode())
+        except asyncio.CancelledError:
+            self.consumed += time.monotonic() - tstart
+            await self._terminate(process)
+            raise
+        finally:
+            self.running -= 1
+
+        if isinstance(process, _Process):
+            return exit_code, process.rusage
+
+        return exit_code, self._get_children_usage()
+
+    async def _run_job(self, job, semaphore):
+        async with semaphore:
+            await self._throttle()
+
+            data = None
+            if job.prepare:
+                data = await asyncio.to_thread(job.prepare)
+
+            slot = self.slots.pop()
+            result = argparse.Namespace(
+                job=job,
+                exit_code=None,
+                output='',
+                cached=bool(data),
+                start=time.monotonic() - self.tstart,
+                duration=0.0,
+                user=0.0,
+                system=0.0,
+                rss=0,
+                slot=slot,
+            )
+
+            try:
+                if data:
+                    result.exit_code = data.exit_code
+                    result.output = data.output
+                else:
+                    await self._execute_job(result)
+            finally:
+                self.slots.append(slot)
+
+            if job.finish and not data and result.exit_code is not None:
+                await asyncio.to_thread(job.finish, result)
+
+            return result
+
+    async def _execute_job(self, result):
+        tstart = time.monotonic()
+        buffer = []
+
+        try:
+            exit_code, rusage = await self._execute(result.job.command, buffer)
+        finally:
+            result.output = b''.join(buffer).decode('utf-8', errors='replace')
+
+        result.exit_code = exit_code
+        result.duration = time.monotonic() - tstart
+
+        if rusage:
+            result.user = rusage.ru_utime
+            result.system = rusage.ru_stime
+            result.rss = rusage.ru_maxrss * _MAXRSS_SCALE
+
+    def _print_progress(self, i, n, elapsed, result):
+        mnemonic = self.mnemonic
+        if result.cached:
+            mnemonic += ' (cached)'
+
+        print(
+            f'[{i}/{n} :: {elapsed:.3f}] {mnemonic} {result.job.name}',
+            file=sys.stderr,
+        )
+
+        if result.exit_code == 0:
+            return
+
+        code = 'timeout' if result.exit_code is None else result.exit_code
+        print(
+            f'FAILED: [code={code}]\n{" ".join(result.job.command)}',
+            file=sys.stderr,
+        )
+
+    async def _run(self, jobs, callback):
+        semaphore = asyncio.Semaphore(self.jobs)
+        self.slots = list(range(self.jobs, 0, -1))
+        self.tstart = time.monotonic()
+
+        if resource:
+            self.children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        tasks = {
+            asyncio.create_task(self._run_job(job, semaphore)): job
+            for job in jobs
+        }
+
+        summary = argparse.Namespace(
+            results=[],
+            failed=0,
+            aborted=False,
+            cancelled=[],
+            makespan=0.0,
+        )
+
+        tstart = time.monotonic()
+
+        for i, future in enumerate(asyncio.as_completed(tasks), start=1):
+            result = await future
+            summary.results.append(result)
+
+            self._print_progress(
+                i, len(tasks), time.monotonic() - tstart, result
+            )
+
+            if callback and callback(result) is False:
+                summary.aborted = True
+                break
+
+            if result.exit_code == 0:
+                continue
+
+            summary.failed += 1
+
+            if self.keep_going > 0 and summary.failed >= self.keep_going:
+                break
+
+        # Cancel everything that is still queued or running.
+        summary.cancelled = [y for x, y in tasks.items() if not x.done()]
+
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        summary.makespan = time.monotonic() - tstart
+
+        return summary
+
+    def run(self, jobs, callback=None):
+        """
+        Run all jobs and return a summary of the results. The 'callback' is
+        invoked with the result of each job in the order of completion.
+        """
+        return asyncio.run(self._run(jobs, callback))
+
+    def write_trace(self, summary, out):
+        """
+        Write the results as Chrome trace events, which can be inspected with
+        'chrome://tracing' or Perfetto. Each job slot is shown as a thread.
+        """
+        events = [
+            {
+                'name': x.job.name,
+                'cat': self.mnemonic,
+                'ph': 'X',
+                'ts': round(x.start * 1e6),
+                'dur': round(x.duration * 1e6),
+                'pid': 1,
+                'tid': x.slot,
+                'args': {
+                    'exit_code': x.exit_code,
+                    'cached': x.cached,
+                    'user': x.user,
+                    'system': x.system,
+                    'rss': x.rss,
+                },
+            }
+            for x in summary.results
+        ]
+
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, out)
+
+    def report(self, summary):
+        """
+        Report the achieved makespan against the ideal makespan and how much
+        cpu time was saved by cancelling jobs.
+        """
+        durations = [x.duration for x in summary.results]
+
+        total = sum(durations)
+        ideal = max(total / self.jobs, max(durations, default=0))
+        makespan = summary.makespan
+        efficiency = ideal / makespan if ideal and makespan else 1
+        cpu = sum(x.user + x.system for x in summary.results)
+
+        print(
+            (
+                f'{self.mnemonic}: makespan: {makespan:.3f}s '
+                f'(ideal: {ideal:.3f}s, cpu: {cpu:.3f}s, jobs: {self.jobs}, '
+                f'efficiency: {efficiency:.1%})'
+            ),
+            file=sys.stderr,
+        )
+
+        if not summary.cancelled:
+            return
+
+        message = f'{self.mnemonic}: cancelled {len(summary.cancelled)} jobs'
+
+        if (saved := self._get_cpu_time_saved(summary)) is not None:
+            message += f', ~{saved:.3f}s cpu time saved'
+
+        print(message, file=sys.stderr)
+
+    def _get_cpu_time_saved(self, summary):
+        # The cpu time of cancelled jobs is extrapolated from the jobs that
+        # actually ran: their cpu time per second of wall time, and their
+        # mean wall time for cancelled jobs without an estimate.
+        executed = [x for x in summary.results if not x.cached]
+
+        wall = sum(x.duration for x in executed)
+        if not wall:
+            return None
+
+        cpu = sum(x.user + x.system for x in executed)
+        mean = wall / len(executed)
+
+        estimate = sum(x.estimate or mean for x in summary.cancelled)
+
+        return max(estimate - self.consumed, 0) * cpu / wall
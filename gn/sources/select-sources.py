@@ -63,11 +63,32 @@ def main():
         default=[],
         type=str,
     )
+    parser.add_argument(
+        '--changed-files',
+        help=(
+            'Only select sources whose translation units depend on at least '
+            'one of the specified files. Requires --impact-index.'
+        ),
+        nargs='*',
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--impact-index',
+        help=(
+            'A file mapping each dependency to the translation units '
+            'depending on it.'
+        ),
+        metavar='PATH',
+        required=False,
+        default=None,
+        type=lambda x: json.load(open(x, 'r')),
+    )
     parser.add_argument(
         '--metadata',
         help="The project's metadata file.",
         required=True,
-        type=gn.Metadata.from_file,
+        type=str,
     )
     parser.add_argument(
         '--include-sources',
@@ -89,6 +110,12 @@ def main():
 
     args = parser.parse_args()
 
+    if args.changed_files is not None and args.impact_index is None:
+        parser.error('--changed-files requires --impact-index')
+
+    include_sources = util.GlobSet(args.include_sources)
+    exclude_sources = util.GlobSet(args.exclude_sources)
+
     incl = util.invoke_split(
         args.include_sources_with_metadata, '=', maxsplit=1
     )
@@ -96,24 +123,37 @@ def main():
         args.exclude_sources_with_metadata, '=', maxsplit=1
     )
 
-    sources = set(
-        args.metadata.get_if(
-            lambda item: (
-                item['type']
-                in {
-                    'executable',
-                    'shared_library',
-                    'static_library',
-                    'source_set',
-                }
-                and util.any_fnmatch(item['source'], args.include_sources)
-                and not util.any_fnmatch(item['source'], args.exclude_sources)
-                and all(item.get(key, value) == value for key, value in incl)
-                and not any(item.get(key) == value for key, value in excl)
-            )
-        ).extract('source')
+    # Only keep the selected items while loading the metadata. This avoids
+    # holding the metadata of the whole project in memory.
+    metadata = gn.Metadata.from_file(
+        args.metadata,
+        predicate=lambda item: (
+            item['type']
+            in {
+                'executable',
+                'shared_library',
+                'static_library',
+                'source_set',
+            }
+            and include_sources.match(item['source'])
+            and not exclude_sources.match(item['source'])
+            and all(item.get(key, value) == value for key, value in incl)
+            and not any(item.get(key) == value for key, value in excl)
+        ),
     )
 
+    sources = set(metadata.extract('source'))
+
+    # Restrict the selection to the translation units which have to be
+    # analyzed again due to the changed files.
+    if args.changed_files is not None:
+        impact = {
+            x
+            for path in args.changed_files
+            for x in args.impact_index.get(path, {}).get('units', [])
+        }
+        sources &= impact
+
     print(json.dumps(list(sources), indent=4), file=args.o)
 
     sys.exit(0)
@@ -63,15 +63,18 @@ def main():
 
     args = parser.parse_args()
 
+    include = util.GlobSet(args.include)
+    exclude = util.GlobSet(args.exclude)
+
     # Get all source files used in the software build.
     sources = set(
         args.metadata.get_if(
             lambda x: (
-                x['testonly'] is False
-                and x['template'] in {'binary', 'component'}
-                and util.any_fnmatch(x['source'], args.include)
-                and not util.any_fnmatch(x['source'], args.exclude)
-            )
+                x['template'] in {'binary', 'component'}
+                and include.match(x['source'])
+                and not exclude.match(x['source'])
+            ),
+            testonly=False,
         ).extract('source')
     )
 
@@ -81,17 +84,13 @@ def main():
     source_map = {
         item['target']: item['source']
         for item in args.metadata.get_if(
-            lambda x: (
-                x['testonly'] is True
-                and x['template'] in {'binary', 'component'}
-            )
+            lambda x: x['template'] in {'binary', 'component'},
+            testonly=True,
         )
     }
 
     # Get metadata for all unit test files
-    unittests = args.metadata.get_if(
-        lambda x: x['testonly'] is True and x['template'] == 'unittest'
-    )
+    unittests = args.metadata.get_if(testonly=True, template='unittest')
 
     # Get all source files associated with a unit test.
     available = {source_map[item['validates']] for item in unittests}
@@ -0,0 +1,108 @@
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+import argparse
+import fnmatch
+import random
+import sys
+import timeit
+
+import util
+
+
+def any_fnmatch(data, globs):
+    return any(fnmatch.fnmatch(data, glob) for glob in globs)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compare the performance of util.GlobSet with matching each glob '
+            'through fnmatch.fnmatch.'
+        )
+    )
+    parser.add_argument(
+        '--items',
+        help='The amount of generated paths to match.',
+        required=False,
+        default=100000,
+        type=int,
+    )
+    parser.add_argument(
+        '--globs',
+        help='The globs to match the generated paths against.',
+        nargs='+',
+        default=['*.c', '*.cc', '*.cpp', '*.cxx', '*/.conan2/*', '*MemMap*.h'],
+        type=str,
+    )
+    parser.add_argument(
+        '--repeat',
+        help='Run each benchmark the specified amount of times.',
+        required=False,
+        default=5,
+        type=int,
+    )
+
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    extensions = ['.c', '.cc', '.cpp', '.h', '.hpp', '.py', '.S', '.txt']
+    items = [
+        f'../../src/dir{rng.randrange(500)}/file{i}'
+        + rng.choice(['', 'MemMap'])
+        + rng.choice(extensions)
+        for i in range(args.items)
+    ]
+
+    globset = util.GlobSet(args.globs)
+
+    expected = [x for x in items if any_fnmatch(x, args.globs)]
+    if globset.filter(items) != expected:
+        print(f'{sys.argv[0]}: error: results differ', file=sys.stderr)
+        sys.exit(1)
+
+    benchmarks = {
+        'fnmatch.fnmatch': lambda: [
+            x for x in items if any_fnmatch(x, args.globs)
+        ],
+        'GlobSet.match': lambda: [x for x in items if globset.match(x)],
+        'GlobSet.filter': lambda: globset.filter(items),
+    }
+
+    baseline = None
+    for name, function in benchmarks.items():
+        elapsed = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        baseline = baseline or elapsed
+
+        print(
+            f'{name:<16} : {elapsed * 1000:8.2f} ms '
+            f'({baseline / elapsed:5.1f}x)'
+        )
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+import vfs
+
+import gn
+
+
+def load_checker():
+    path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '..',
+        'gn',
+        'includes',
+        'check-include-directories.py',
+    )
+
+    spec = importlib.util.spec_from_file_location('checker', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def run_backend(checker, context, desc, targets):
+    tstart = time.perf_counter()
+
+    results = {}
+    for target in targets:
+        analysis = checker.UnusedIncludeDirectoriesAnalysis(
+            context, desc[target]
+        )
+        results[target] = analysis.run()
+
+    return results, time.perf_counter() - tstart
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Compare the libclang and the dependencies backend of the unused '
+            'include directories check regarding their results and their '
+            'performance.'
+        )
+    )
+    parser.add_argument(
+        '--compilation-database',
+        help="The project's compilation database.",
+        required=True,
+        type=str,
+    )
+    parser.add_argument(
+        '--dependencies',
+        help='The dependency data of all translation units.',
+        required=True,
+        type=str,
+    )
+    parser.add_argument(
+        '--description',
+        help="The project's build description.",
+        required=True,
+        type=gn.Description.from_file,
+    )
+    parser.add_argument(
+        '--target',
+        help='The targets to analyze. Defaults to all targets with sources.',
+        nargs='*',
+        default=[],
+        type=str,
+    )
+    parser.add_argument(
+        '--vfs-config',
+        help=(
+            'A file descriping the mapping of files to each other as used in a '
+            'virtual filesystem.'
+        ),
+        default=vfs.VirtualFileSystemMap(),
+        type=vfs.VirtualFileSystemMap.from_vfs_config,
+    )
+
+    args = parser.parse_args()
+
+    checker = load_checker()
+
+    desc = args.description
+    targets = args.target or [
+        label
+        for label, details in desc.items()
+        if details['type']
+        in {'executable', 'shared_library', 'static_library', 'source_set'}
+        and any(
+            os.path.splitext(x)[1] in {'.c', '.cc', '.cpp', '.cxx'}
+            for x in details.get('sources', [])
+        )
+    ]
+
+    with open(args.dependencies, 'r') as file:
+        scanner = checker.DependencyScanner(json.load(file))
+
+    backends = {
+        'libclang': checker.AnalysisContext(
+            args.compilation_database, args.vfs_config
+        ),
+        'dependencies': checker.AnalysisContext(
+            args.compilation_database, args.vfs_config, scanner=scanner
+        ),
+    }
+
+    results = {}
+    baseline = None
+    for name, context in backends.items():
+        results[name], elapsed = run_backend(checker, context, desc, targets)
+        baseline = baseline or elapsed
+
+        print(
+            f'{name:<12} : {elapsed * 1000:10.2f} ms '
+            f'({baseline / elapsed:5.1f}x)'
+        )
+
+    mismatches = [
+        x
+        for x in targets
+        if results['libclang'][x] != results['dependencies'][x]
+    ]
+
+    print(f'agreement    : {len(targets) - len(mismatches)}/{len(targets)}')
+
+    for target in mismatches:
+        print(
+            (
+                f'{target}: libclang={sorted(results["libclang"][target])} '
+                f'dependencies={sorted(results["dependencies"][target])}'
+            ),
+            file=sys.stderr,
+        )
+
+    sys.exit(len(mismatches) != 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -29,6 +29,125 @@ import subprocess
 import sys
 import tempfile
 
+import gn
+
+
+def is_build_file(path):
+    if os.path.basename(path) == '.gn':
+        return True
+
+    return os.path.splitext(path)[1] in {'.gn', '.gni'}
+
+
+def get_top_most_targets(desc):
+    # Like 'gn analyze', only report the affected targets no other affected
+    # target depends on. Building them builds all other affected targets.
+    deps = set()
+    for data in desc.values():
+        deps.update(data.get('deps', []), data.get('data_deps', []))
+
+    return sorted(x for x, _ in desc.items() if x not in deps)
+
+
+def analyze_with_gn(args, data):
+    # Prepare input and output files for gn analyze
+    infile = tempfile.NamedTemporaryFile(mode='w', delete=False)
+    infile.write(json.dumps(data))
+    infile.close()
+
+    outfile = tempfile.NamedTemporaryFile(mode='r')
+
+    invocation = [
+        args.gn_tool,
+        'analyze',
+        args.build_dir,
+        infile.name,
+        outfile.name,
+    ]
+
+    result = subprocess.run(invocation, check=False)
+    os.unlink(infile.name)
+
+    if result.returncode != 0:
+        print('error: gn analyzed failed', file=sys.stderr)
+        sys.exit(1)
+
+    return json.load(outfile)
+
+
+def analyze_locally(args, data):
+    desc = gn.Description.from_file(args.description)
+
+    # Paths within the dispatched description are relative to the build
+    # directory. Absolute paths are kept as they are by joining them.
+    root = gn.root()
+    files = [
+        os.path.relpath(
+            os.path.join(root, x.removeprefix('//')), args.build_dir
+        )
+        for x in data['files']
+    ]
+
+    affected_desc = desc.get_affected(files)
+    affected = set(affected_desc.keys())
+
+    test_targets = [
+        x
+        for x in data['test_targets']
+        if gn.label.remove_toolchain(x) in affected
+    ]
+
+    if 'all' in data['additional_compile_targets']:
+        # A changed build file affects all targets, which 'gn analyze'
+        # reports as 'all' instead of listing each of them.
+        if any(is_build_file(x) for x in files):
+            compile_targets = ['all']
+        else:
+            compile_targets = get_top_most_targets(affected_desc)
+    else:
+        compile_targets = [
+            x
+            for x in data['additional_compile_targets']
+            if gn.label.remove_toolchain(x) in affected
+        ]
+
+    compile_targets += [x for x in test_targets if x not in compile_targets]
+
+    status = 'Found dependency' if compile_targets else 'No dependency'
+
+    return {
+        'status': status,
+        'compile_targets': compile_targets,
+        'test_targets': test_targets,
+    }
+
+
+def expand_impact(args, data):
+    with open(args.impact_index, 'r') as file:
+        index = json.load(file)
+
+    # Paths within the impact index are relative to the build directory.
+    root = gn.root()
+    files = [
+        os.path.relpath(
+            os.path.join(root, x.removeprefix('//')), args.build_dir
+        )
+        for x in data['files']
+    ]
+
+    # Add the translation units including any of the changed files. Headers
+    # are often not listed by any target, so neither `gn analyze` nor the
+    # local analysis could relate them to a target otherwise.
+    units = {x for path in files for x in index.get(path, {}).get('units', [])}
+    units = [
+        '//' + os.path.relpath(os.path.join(args.build_dir, x), root)
+        for x in sorted(units)
+    ]
+
+    data['files'] += [x for x in units if x not in data['files']]
+
+    return data
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -97,6 +216,26 @@ def main():
         required=True,
         type=str,
     )
+    parser.add_argument(
+        '--impact-index',
+        help=(
+            'The impact index of the build. If specified, the translation '
+            'units including any of the files are analyzed as well.'
+        ),
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--description',
+        help=(
+            "The build's dispatched description file. If specified, affected "
+            'targets are computed locally instead of invoking `gn analyze`.'
+        ),
+        required=False,
+        default=None,
+        type=str,
+    )
     args = parser.parse_args()
 
     data = {
@@ -108,29 +247,13 @@ def main():
         'additional_compile_targets': args.additional_compile_targets,
     }
 
-    # Prepare input and output files for gn analyze
-    infile = tempfile.NamedTemporaryFile(mode='w', delete=False)
-    infile.write(json.dumps(data))
-    infile.close()
-
-    outfile = tempfile.NamedTemporaryFile(mode='r')
-
-    invocation = [
-        args.gn_tool,
-        'analyze',
-        args.build_dir,
-        infile.name,
-        outfile.name,
-    ]
-
-    result = subprocess.run(invocation, check=False)
-    os.unlink(infile.name)
-
-    if result.returncode != 0:
-        print('error: gn analyzed failed', file=sys.stderr)
-        sys.exit(1)
+    if args.impact_index:
+        data = expand_impact(args, data)
 
-    data = json.load(outfile)
+    if args.description:
+        data = analyze_locally(args, data)
+    else:
+        data = analyze_with_gn(args, data)
 
     if message := data.get('error'):
         print(f'error: gn analyze: {message}', file=sys.stderr)
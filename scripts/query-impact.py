@@ -0,0 +1,102 @@
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2026 Steffen Nuessle
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+
+
+import argparse
+import json
+import os
+import sys
+
+
+def get_impact(index, files):
+    units = set()
+    targets = set()
+
+    for path in files:
+        entry = index.get(path, {})
+
+        units.update(entry.get('units', []))
+        targets.update(entry.get('targets', []))
+
+    return {'units': sorted(units), 'targets': sorted(targets)}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            'Query which translation units and GN targets must be checked '
+            'again if the specified files change.'
+        ),
+        fromfile_prefix_chars='@',
+    )
+    parser.add_argument(
+        'files',
+        help='The changed source and header files.',
+        nargs='+',
+        type=str,
+    )
+    parser.add_argument(
+        '--build-dir',
+        help=(
+            'Path to the build output directory. If specified, the files '
+            'are given relative to the working directory instead of '
+            'relative to the build directory.'
+        ),
+        required=False,
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        '--impact-index',
+        help=(
+            'The impact index written by transform-dependencies.py, usually '
+            'found at gen/dependencies-impact.json within the build directory.'
+        ),
+        required=True,
+        type=lambda x: json.load(open(x, 'r')),
+    )
+    parser.add_argument(
+        '-o',
+        help='The output file containing the affected units and targets.',
+        metavar='PATH',
+        required=False,
+        default=sys.stdout,
+        type=lambda x: open(x, 'w'),
+    )
+
+    args = parser.parse_args()
+
+    files = args.files
+    if args.build_dir:
+        files = [os.path.relpath(x, args.build_dir) for x in files]
+
+    data = get_impact(args.impact_index, files)
+
+    print(json.dumps(data, indent=4), file=args.o)
+
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()